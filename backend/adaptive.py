@@ -0,0 +1,94 @@
+"""
+Latency-budget controller for the frame loops.
+
+The controller walks a ladder of quality levels (inference size, frame
+skip, depth on/off). It steps down when the smoothed end-to-end frame
+latency stays above the target and steps back up once there is sustained
+headroom, with a cooldown between changes to avoid oscillating.
+"""
+
+import threading
+import time
+
+
+OBJECT_QUALITY_LEVELS = [
+    {"imgsz": 640, "frame_skip": 1, "depth": True},
+    {"imgsz": 512, "frame_skip": 1, "depth": True},
+    {"imgsz": 416, "frame_skip": 1, "depth": False},
+    {"imgsz": 320, "frame_skip": 1, "depth": False},
+    {"imgsz": 320, "frame_skip": 2, "depth": False},
+    {"imgsz": 256, "frame_skip": 3, "depth": False},
+]
+
+CURRENCY_QUALITY_LEVELS = [
+    {"imgsz": 320, "frame_skip": 1},
+    {"imgsz": 288, "frame_skip": 1},
+    {"imgsz": 256, "frame_skip": 1},
+    {"imgsz": 256, "frame_skip": 2},
+    {"imgsz": 224, "frame_skip": 3},
+]
+
+
+class AdaptiveController:
+    def __init__(self, levels, target_latency_ms=150.0, headroom=0.6, smoothing=0.2,
+                 min_samples=10, cooldown_seconds=2.0, name="controller"):
+        self.levels = levels
+        self.target_latency_ms = target_latency_ms
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.min_samples = min_samples
+        self.cooldown_seconds = cooldown_seconds
+        self.name = name
+
+        self._lock = threading.Lock()
+        self.level = 0
+        self.latency_ms = None
+        self._samples_since_change = 0
+        self._last_change = 0.0
+        self.on_change = None
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def should_process(self, frame_index):
+        """False on frames the current level skips"""
+        return frame_index % self.settings.get("frame_skip", 1) == 0
+
+    def record(self, latency_seconds):
+        """Feed one end-to-end frame latency; may move one level up or down"""
+        latency_ms = latency_seconds * 1000.0
+        with self._lock:
+            if self.latency_ms is None:
+                self.latency_ms = latency_ms
+            else:
+                self.latency_ms += self.smoothing * (latency_ms - self.latency_ms)
+            self._samples_since_change += 1
+
+            now = time.time()
+            if self._samples_since_change < self.min_samples or now - self._last_change < self.cooldown_seconds:
+                return
+
+            new_level = self.level
+            if self.latency_ms > self.target_latency_ms and self.level < len(self.levels) - 1:
+                new_level = self.level + 1
+            elif self.latency_ms < self.target_latency_ms * self.headroom and self.level > 0:
+                new_level = self.level - 1
+            if new_level == self.level:
+                return
+
+            previous_level = self.level
+            self.level = new_level
+            self._samples_since_change = 0
+            self._last_change = now
+
+        if self.on_change is not None:
+            self.on_change(previous_level, new_level, self.settings, self.latency_ms)
+
+    def status(self):
+        return {
+            "level": self.level,
+            "settings": dict(self.settings),
+            "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "target_latency_ms": self.target_latency_ms,
+        }
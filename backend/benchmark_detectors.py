@@ -0,0 +1,96 @@
+"""
+Latency and accuracy benchmark of the detector backends.
+
+Runs every requested backend over a folder of sample images and compares it
+with the PyTorch checkpoint: per-image latency percentiles, plus recall and
+precision of each backend's boxes against the PyTorch boxes (same class,
+IoU >= 0.5).
+
+    python benchmark_detectors.py yolov8n.pt sample_images --backends torch onnx openvino --int8
+"""
+
+import argparse
+import time
+
+import numpy as np
+import cv2
+
+from detector_backend import load_detector, list_calibration_images
+from suppression import pairwise_iou
+
+
+def run_backend(model, images, imgsz, conf, warmup=3, repeats=1):
+    for image in images[:warmup]:
+        model(image, imgsz=imgsz, conf=conf, verbose=False)
+
+    latencies, outputs = [], []
+    for image in images:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            results = model(image, imgsz=imgsz, conf=conf, verbose=False)
+            latencies.append(time.perf_counter() - started)
+        boxes = results[0].boxes
+        outputs.append((boxes.xyxy.cpu().numpy(), boxes.cls.cpu().numpy().astype(int)))
+    return np.array(latencies) * 1000.0, outputs
+
+
+def match_counts(reference, candidate, iou_threshold=0.5):
+    """(matched, reference_total, candidate_total) summed over all images"""
+    matched = reference_total = candidate_total = 0
+    for (ref_boxes, ref_classes), (cand_boxes, cand_classes) in zip(reference, candidate):
+        reference_total += len(ref_boxes)
+        candidate_total += len(cand_boxes)
+        if not len(ref_boxes) or not len(cand_boxes):
+            continue
+        iou = pairwise_iou(ref_boxes, cand_boxes)
+        iou[ref_classes[:, None] != cand_classes[None, :]] = 0.0
+        used = set()
+        for row in range(len(ref_boxes)):
+            for col in np.argsort(-iou[row]):
+                if iou[row, col] < iou_threshold:
+                    break
+                if col not in used:
+                    used.add(col)
+                    matched += 1
+                    break
+    return matched, reference_total, candidate_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare YOLO detector backends on CPU")
+    parser.add_argument("model", help="PyTorch checkpoint, e.g. yolov8n.pt")
+    parser.add_argument("images", help="Folder of sample images (also used for INT8 calibration)")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "openvino"])
+    parser.add_argument("--int8", action="store_true", help="Also benchmark INT8 variants of onnx/openvino")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=0.4)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=1)
+    args = parser.parse_args()
+
+    images = [cv2.imread(path) for path in list_calibration_images(args.images, args.limit)]
+    images = [image for image in images if image is not None]
+    if not images:
+        raise SystemExit(f"No images found in {args.images}")
+
+    variants = [(backend, False) for backend in args.backends]
+    if args.int8:
+        variants += [(backend, True) for backend in args.backends if backend != "torch"]
+
+    reference_model = load_detector(args.model, "torch")
+    _, reference = run_backend(reference_model, images, args.imgsz, args.conf)
+
+    print(f"{'backend':<16}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'recall':>10}{'precision':>11}")
+    for backend, int8 in variants:
+        model = load_detector(args.model, backend, imgsz=args.imgsz, int8=int8, calibration_dir=args.images)
+        latencies, outputs = run_backend(model, images, args.imgsz, args.conf, repeats=args.repeats)
+        matched, reference_total, candidate_total = match_counts(reference, outputs)
+        recall = matched / reference_total if reference_total else 1.0
+        precision = matched / candidate_total if candidate_total else 1.0
+        name = f"{backend}{'-int8' if int8 else ''}"
+        print(f"{name:<16}{np.percentile(latencies, 50):>10.1f}{np.percentile(latencies, 95):>10.1f}"
+              f"{latencies.mean():>10.1f}{recall:>10.3f}{precision:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
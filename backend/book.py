@@ -13,8 +13,11 @@ import threading
 import queue
 from typing import List, Dict, Any
 from datetime import datetime
+import time
 import uvicorn
 
+from metrics import TTS_QUEUE_WAIT_SECONDS, WEBSOCKET_FANOUT_SECONDS, metrics_response
+
 app = FastAPI(title="PDF Reader System")
 
 # CORS middleware
@@ -68,7 +71,7 @@ tts_available = init_tts()
 def speak_text(text):
     """Add text to speech queue"""
     if tts_available and text.strip():
-        speech_queue.put(text)
+        speech_queue.put((text, time.perf_counter()))
 
 def speech_worker():
     """Worker thread for TTS"""
@@ -77,9 +80,11 @@ def speech_worker():
     
     while reading_thread_active:
         try:
-            text = speech_queue.get(timeout=1)
-            if text is None:
+            request = speech_queue.get(timeout=1)
+            if request is None:
                 break
+            text, queued_at = request
+            TTS_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued_at, service="book", queue="engine")
             
             if engine and not reading_status["paused"]:
                 engine.say(text)
@@ -103,11 +108,13 @@ async def broadcast_message(message: Dict[str, Any]):
         json_message = json.dumps(message)
         disconnected = []
         
+        fanout_started = time.perf_counter()
         for websocket in websocket_connections:
             try:
                 await websocket.send_text(json_message)
             except:
                 disconnected.append(websocket)
+        WEBSOCKET_FANOUT_SECONDS.observe(time.perf_counter() - fanout_started, service="book", channel="logs")
         
         # Remove disconnected clients
         for ws in disconnected:
@@ -366,6 +373,10 @@ async def stop_reading():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error stopping reading: {str(e)}")
 
+@app.get("/metrics")
+async def get_metrics():
+    return metrics_response()
+
 @app.get("/status")
 async def get_status():
     """Get current reading status"""
@@ -0,0 +1,172 @@
+"""
+Fan-out MJPEG broadcaster.
+
+One producer thread per camera runs the capture/inference pipeline and
+publishes each encoded JPEG once. Every /video_feed client subscribes with
+its own small queue that drops the oldest frame when full, so a slow viewer
+only skips frames for itself and never throttles the producer or the others.
+
+Result-only clients (e.g. a detections WebSocket) subscribe with
+video=False: they keep the producer running but receive no frames, and
+video_subscriber_count lets the producer skip drawing and encoding while
+nobody watches the video.
+"""
+
+import threading
+from collections import deque
+
+
+MJPEG_MEDIA_TYPE = "multipart/x-mixed-replace; boundary=frame"
+
+
+def mjpeg_chunk(frame_bytes):
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+
+
+# -------------------- SUBSCRIBER --------------------
+class FrameSubscriber:
+    def __init__(self, max_queue=2, video=True):
+        self.video = video
+        self._frames = deque(maxlen=max_queue)
+        self._condition = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+        self.delivered = 0
+
+    def push(self, chunk):
+        with self._condition:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(chunk)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        with self._condition:
+            if not self._frames and not self.closed:
+                self._condition.wait(timeout)
+            if not self._frames:
+                return None
+            self.delivered += 1
+            return self._frames.popleft()
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+# -------------------- BROADCASTER --------------------
+class FrameBroadcaster:
+    """
+    producer(stop_event, publish) runs in a background thread while at least
+    one subscriber is connected. It should call publish(jpeg_bytes) for every
+    encoded frame and return once stop_event is set.
+    """
+
+    def __init__(self, producer, name="camera", max_queue=2):
+        self.producer = producer
+        self.name = name
+        self.max_queue = max_queue
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.frames_published = 0
+        self.on_error = None
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    @property
+    def video_subscriber_count(self):
+        with self._lock:
+            return sum(1 for subscriber in self._subscribers if subscriber.video)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def publish(self, frame_bytes):
+        """Wrap the JPEG once and hand the same bytes to every subscriber"""
+        chunk = mjpeg_chunk(frame_bytes)
+        with self._lock:
+            subscribers = [subscriber for subscriber in self._subscribers if subscriber.video]
+        for subscriber in subscribers:
+            subscriber.push(chunk)
+        self.frames_published += 1
+
+    def subscribe(self, video=True):
+        subscriber = FrameSubscriber(self.max_queue, video)
+        with self._lock:
+            self._subscribers.append(subscriber)
+            if not self.running or self._stop_event.is_set():
+                self._start_producer()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.close()
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+            if not self._subscribers:
+                self._stop_event.set()
+
+    def stream(self, timeout=1.0):
+        """Generator of multipart chunks for one StreamingResponse client"""
+        subscriber = self.subscribe()
+        try:
+            while not subscriber.closed:
+                chunk = subscriber.get(timeout)
+                if chunk is not None:
+                    yield chunk
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "running": self.running,
+            "subscribers": len(subscribers),
+            "frames_published": self.frames_published,
+            "frames_dropped": sum(subscriber.dropped for subscriber in subscribers),
+        }
+
+    def stop(self, timeout=2.0):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers = []
+            self._stop_event.set()
+            thread = self._thread
+        for subscriber in subscribers:
+            subscriber.close()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _start_producer(self):
+        previous_thread = self._thread
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run_producer, args=(self._stop_event, previous_thread),
+            name=f"{self.name}-broadcaster", daemon=True
+        )
+        self._thread.start()
+
+    def _run_producer(self, stop_event, previous_thread):
+        # A producer still winding down from the previous viewers must release the camera first
+        if previous_thread is not None:
+            previous_thread.join()
+        try:
+            self.producer(stop_event, self.publish)
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(e)
+        finally:
+            stop_event.set()
+            with self._lock:
+                subscribers = list(self._subscribers) if self._stop_event is stop_event else []
+            for subscriber in subscribers:
+                subscriber.close()
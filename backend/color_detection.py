@@ -3,10 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 import cv2
 import numpy as np
-import pyttsx3
 import speech_recognition as sr
 import threading
-import queue
 import asyncio
 import json
 import base64
@@ -16,6 +14,11 @@ from datetime import datetime
 import winsound
 import uvicorn
 
+from broadcaster import FrameBroadcaster, MJPEG_MEDIA_TYPE
+from speech import SpeechService
+from metrics import WEBSOCKET_FANOUT_SECONDS, stage_timer, metrics_response
+from tracing import get_tracer
+
 app = FastAPI(title="Color Detection System")
 
 # CORS middleware
@@ -57,15 +60,14 @@ color_ranges = {
 skin_range = (np.array([0, 30, 60]), np.array([20, 150, 255]))
 
 # ----------------------
-# TTS Setup with queue
+# TTS Setup
 # ----------------------
-engine = pyttsx3.init()
-engine.setProperty('rate', 150)
-speech_queue = queue.Queue()
+speech_service = SpeechService(rate=150, name="color")
+tracer = get_tracer("color")
 
 def speak(text):
     print(f"[TTS]: {text}")
-    speech_queue.put(text)
+    speech_service.speak(text)
     # Broadcast to websockets
     broadcast_log({
         "timestamp": datetime.now().strftime("%H:%M:%S"),
@@ -73,17 +75,6 @@ def speak(text):
         "type": "tts"
     })
 
-def speech_loop():
-    while True:
-        text = speech_queue.get()
-        if text is None:
-            break
-        engine.say(text)
-        engine.runAndWait()
-
-speech_thread = threading.Thread(target=speech_loop, daemon=True)
-speech_thread.start()
-
 # ----------------------
 # Voice Recognition Setup
 # ----------------------
@@ -191,11 +182,13 @@ async def broadcast_log(log_data: Dict[str, Any]):
     if websocket_connections:
         message = json.dumps(log_data)
         disconnected = []
+        fanout_started = time.perf_counter()
         for websocket in websocket_connections:
             try:
                 await websocket.send_text(message)
             except:
                 disconnected.append(websocket)
+        WEBSOCKET_FANOUT_SECONDS.observe(time.perf_counter() - fanout_started, service="color", channel="logs")
         
         # Remove disconnected clients
         for ws in disconnected:
@@ -238,10 +231,11 @@ def init_camera():
 # Initialize camera
 init_camera()
 
-def generate_frames():
+def run_color_pipeline(stop_event, publish):
+    """Broadcaster producer: one capture and detection loop shared by every viewer"""
     global camera, system_status, last_spoken_times
     
-    while True:
+    while not stop_event.is_set():
         try:
             with camera_lock:
                 if camera is None or not camera.isOpened():
@@ -250,14 +244,17 @@ def generate_frames():
                         time.sleep(1)
                         continue
                 
-                ret, frame = camera.read()
+                tracer.next_frame()
+                with stage_timer("color", "capture_wait"):
+                    ret, frame = camera.read()
                 if not ret:
                     continue
 
             current_time = time.time()
 
             if system_status["detecting"] and not system_status["system_paused"]:
-                frame, colors_found = detect_colors(frame)
+                with stage_timer("color", "inference"):
+                    frame, colors_found = detect_colors(frame)
                 system_status["detected_colors"] = colors_found
                 system_status["last_detection_time"] = datetime.now().isoformat()
 
@@ -307,11 +304,10 @@ def generate_frames():
                 cv2.putText(frame, "⏸️ SYSTEM PAUSED", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
 
             # Encode frame
-            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+            with stage_timer("color", "encode"):
+                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
             if ret:
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                publish(buffer.tobytes())
             
             time.sleep(0.033)  # ~30 FPS
             
@@ -319,6 +315,11 @@ def generate_frames():
             print(f"📷 Frame generation error: {e}")
             time.sleep(1)
 
+frame_broadcaster = FrameBroadcaster(run_color_pipeline, name="color")
+
+def generate_frames():
+    return frame_broadcaster.stream()
+
 # ----------------------
 # API Endpoints
 # ----------------------
@@ -326,13 +327,34 @@ def generate_frames():
 async def root():
     return {"message": "Color Detection System API", "status": "running"}
 
+@app.get("/metrics")
+async def get_metrics():
+    return metrics_response()
+
+@app.get("/trace")
+async def get_trace():
+    """Chrome / Perfetto trace-event JSON for the most recent traced frames"""
+    return tracer.export()
+
+@app.post("/trace/start")
+async def start_trace():
+    tracer.start()
+    return tracer.status()
+
+@app.post("/trace/stop")
+async def stop_trace():
+    tracer.stop()
+    return tracer.status()
+
 @app.get("/status")
 async def get_status():
     return {
         **system_status,
         "connected_clients": len(websocket_connections),
         "camera_available": camera is not None and camera.isOpened(),
-        "available_colors": list(color_ranges.keys())
+        "video_clients": frame_broadcaster.subscriber_count,
+        "available_colors": list(color_ranges.keys()),
+        "tracing": tracer.status()
     }
 
 @app.post("/start-detection")
@@ -399,7 +421,7 @@ async def resume_system():
 async def video_feed():
     return StreamingResponse(
         generate_frames(),
-        media_type="multipart/x-mixed-replace; boundary=frame"
+        media_type=MJPEG_MEDIA_TYPE
     )
 
 @app.websocket("/ws/logs")
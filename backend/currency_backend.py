@@ -4,9 +4,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from ultralytics import YOLO
-import pyttsx3
 import cv2
+import numpy as np
 import time
 import threading
 from collections import deque
@@ -14,6 +13,14 @@ import queue
 from fastapi.responses import StreamingResponse
 import io
 
+from suppression import suppress_overlaps, filter_box_sizes
+from adaptive import AdaptiveController, CURRENCY_QUALITY_LEVELS
+from detector_backend import load_detector, detect_arrays
+from inference_pool import InferencePool, PoolUnavailable
+from speech import SpeechService
+from metrics import observe_stage, stage_timer, metrics_response
+from tracing import get_tracer
+
 app = FastAPI()
 
 # Enable CORS
@@ -36,36 +43,19 @@ app.add_middleware(
 # -------------------------
 class ThreadSafeTTS:
     def __init__(self):
-        self.tts_queue = queue.Queue()
-        self._stop_event = threading.Event()
-        self.is_speaking = False
-        self.worker_thread = threading.Thread(target=self._tts_worker, daemon=True)
-        self.worker_thread.start()
-
-    def _tts_worker(self):
-        engine = pyttsx3.init()
-        engine.setProperty('rate', 180)
-        engine.setProperty('volume', 0.9)
-        while not self._stop_event.is_set():
-            try:
-                text = self.tts_queue.get(timeout=0.5)
-                self.is_speaking = True
-                engine.say(text)
-                engine.runAndWait()
-                self.is_speaking = False
-                self.tts_queue.task_done()
-            except queue.Empty:
-                continue
-        engine.stop()
+        # One persistent engine; repeated totals play from the phrase cache
+        self.speech = SpeechService(rate=180, volume=0.9, name="currency")
+
+    @property
+    def is_speaking(self):
+        return not self.speech.idle
 
     def speak_async(self, text):
         if not self.is_speaking:
-            self.tts_queue.put(text)
-            self.is_speaking = True
+            self.speech.speak(text)
 
     def stop(self):
-        self._stop_event.set()
-        self.worker_thread.join()
+        self.speech.close()
 
 # -------------------------
 # Separate thread for camera capture
@@ -118,14 +108,26 @@ class CameraCapture:
 # YOLO detection and TTS worker
 # -------------------------
 class DetectionSystem:
-    def __init__(self, model_path, camera_url):
-        print("Loading YOLO model...")
-        self.model = YOLO(model_path)
+    def __init__(self, model_path, camera_url, backend="torch", int8=False, calibration_dir=None, inference_workers=0):
+        print(f"Loading YOLO model ({backend})...")
+        self.model = load_detector(model_path, backend, imgsz=320, int8=int8, calibration_dir=calibration_dir)
         print("Model loaded successfully!")
 
-        self.tts_system = ThreadSafeTTS()
         self.cam_capture = CameraCapture(camera_url)
 
+        # Optional worker processes so concurrent /video_frame requests infer in parallel;
+        # they start after the camera opened, so a failed start leaves none behind
+        self.inference_pool = None
+        if inference_workers > 0:
+            self.inference_pool = InferencePool(
+                load_detector, (model_path, backend, 320, int8, calibration_dir), detect_arrays,
+                workers=inference_workers, max_frame_shape=(240, 320, 3), name="currency"
+            )
+            self.inference_pool.start()
+            print(f"Started {inference_workers} inference worker processes")
+
+        self.tts_system = ThreadSafeTTS()
+
         self.note_values = {
             "10 Rupee": 10,
             "20 Rupee": 20,
@@ -149,10 +151,62 @@ class DetectionSystem:
         self.DISPLAY_HEIGHT = 480
         self.running = True
 
+        self.quality_controller = AdaptiveController(CURRENCY_QUALITY_LEVELS, target_latency_ms=120, name="currency")
+        self.quality_controller.on_change = lambda old, new, settings, latency: print(
+            f"Quality level {old} -> {new} ({latency:.0f} ms): {settings}"
+        )
+        self.frame_index = 0
+        self.last_notes = []
+
+    def detect_notes(self, frame, imgsz):
+        """(label, confidence, display box) for every note kept after suppression"""
+        process_width, process_height = imgsz, imgsz * 3 // 4
+        with stage_timer("currency", "preprocess"):
+            process_frame = cv2.resize(frame, (process_width, process_height))
+
+        params = {"imgsz": imgsz, "conf": self.CONF_THRESHOLD, "iou": 0.5}
+        with stage_timer("currency", "inference"):
+            detections = None
+            if self.inference_pool is not None:
+                try:
+                    detections = self.inference_pool.infer(process_frame, params)
+                except PoolUnavailable:
+                    pass
+            boxes, scores, class_ids = detections or detect_arrays(self.model, process_frame, params)
+
+        postprocess_started = time.perf_counter()
+        notes = []
+        if len(scores):
+            names = self.model.names
+            scale = np.array([
+                self.DISPLAY_WIDTH / process_width, self.DISPLAY_HEIGHT / process_height,
+                self.DISPLAY_WIDTH / process_width, self.DISPLAY_HEIGHT / process_height
+            ])
+            display_boxes = (boxes * scale).astype(int)
+
+            valid = (scores >= self.CONF_THRESHOLD) & filter_box_sizes(
+                display_boxes, min_width=self.MIN_BOX_WIDTH, min_height=self.MIN_BOX_HEIGHT
+            )
+            candidate_indices = np.flatnonzero(valid)
+            # Drop the same note being reported as two denominations
+            keep = suppress_overlaps(
+                display_boxes[candidate_indices], scores[candidate_indices],
+                iou_threshold=0.5, containment_threshold=0.8
+            )
+
+            for index in candidate_indices[keep]:
+                label = names[int(class_ids[index])].replace("_", " ")
+                notes.append((label, float(scores[index]), tuple(int(v) for v in display_boxes[index])))
+        observe_stage("currency", "postprocess", time.perf_counter() - postprocess_started)
+        return notes
+
     def process_frame(self):
-        frame = self.cam_capture.get_frame()
+        get_tracer("currency").next_frame()
+        with stage_timer("currency", "capture_wait"):
+            frame = self.cam_capture.get_frame()
         if frame is None:
             return None
+        started = time.perf_counter()
 
         self.fps_counter += 1
         if time.time() - self.fps_timer > 1:
@@ -161,33 +215,16 @@ class DetectionSystem:
             self.fps_timer = time.time()
 
         display_frame = cv2.resize(frame, (self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT))
-        process_frame = cv2.resize(frame, (320, 240))
-
-        results = self.model(
-            process_frame,
-            verbose=False,
-            conf=self.CONF_THRESHOLD,
-            iou=0.5,
-            imgsz=320
-        )
+
+        # Skipped frames redraw the last notes and do not count towards the consistency window
+        self.frame_index += 1
+        run_inference = self.quality_controller.should_process(self.frame_index)
+        if run_inference:
+            self.last_notes = self.detect_notes(frame, self.quality_controller.settings["imgsz"])
 
         detected_labels = []
-        if results and results[0].boxes:
-            names = results[0].names
-            for box in results[0].boxes:
-                conf = float(box.conf[0])
-                if conf < self.CONF_THRESHOLD:
-                    continue
-                cls_id = int(box.cls[0])
-                label = names[cls_id].replace("_", " ")
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                x1 = int(x1 * self.DISPLAY_WIDTH / 320)
-                y1 = int(y1 * self.DISPLAY_HEIGHT / 240)
-                x2 = int(x2 * self.DISPLAY_WIDTH / 320)
-                y2 = int(y2 * self.DISPLAY_HEIGHT / 240)
-                width, height = x2 - x1, y2 - y1
-                if width < self.MIN_BOX_WIDTH or height < self.MIN_BOX_HEIGHT:
-                    continue
+        with stage_timer("currency", "annotate"):
+            for label, conf, (x1, y1, x2, y2) in self.last_notes:
                 detected_labels.append(label)
                 color = (0, 255, 0) if conf > 0.7 else (0, 255, 255)
                 cv2.rectangle(display_frame, (x1, y1), (x2, y2), color, 2)
@@ -195,6 +232,10 @@ class DetectionSystem:
                 cv2.putText(display_frame, text, (x1, y1 - 10),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
 
+        if not run_inference:
+            self._finish_frame(display_frame, started)
+            return display_frame
+
         self.recent_detections.append(detected_labels)
 
         if detected_labels and len(self.recent_detections) == self.recent_detections.maxlen:
@@ -219,23 +260,27 @@ class DetectionSystem:
             else:
                 self.last_sentence = ""
 
+        self._finish_frame(display_frame, started)
+        return display_frame
+
+    def _finish_frame(self, display_frame, started):
         fps = int(self.fps_counter / (time.time() - self.fps_timer))
         status_text = f"FPS: {fps}"
         cv2.putText(display_frame, status_text, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-        return display_frame
+        self.quality_controller.record(time.perf_counter() - started)
 
     def stop(self):
         self.running = False
+        if self.inference_pool is not None:
+            self.inference_pool.stop()
         self.tts_system.stop()
         self.cam_capture.stop()
         cv2.destroyAllWindows()
 
-# Initialize the detection system
-detection_system = DetectionSystem(
-    model_path=r"C:\Users\Hp\Downloads\best (3).pt",
-    camera_url="http://10.200.19.164:4747/video"  # Update your camera source here or use 0 for USB webcam
-)
+# The detection system is built in the startup event: spawned inference workers
+# re-import this module and must not open the camera or start workers themselves
+detection_system = None
+tracer = get_tracer("currency")
 
 @app.get("/video_frame")
 def get_video_frame():
@@ -243,15 +288,56 @@ def get_video_frame():
     if frame is None:
         return {"error": "No frame available"}
 
-    ret, jpeg = cv2.imencode('.jpg', frame)
+    with stage_timer("currency", "encode"):
+        ret, jpeg = cv2.imencode('.jpg', frame)
     if not ret:
         return {"error": "Failed to encode frame"}
 
     return StreamingResponse(io.BytesIO(jpeg.tobytes()), media_type="image/jpeg")
 
+@app.get("/metrics")
+def get_metrics():
+    return metrics_response()
+
+@app.get("/trace")
+def get_trace():
+    """Chrome / Perfetto trace-event JSON for the most recent traced frames"""
+    return tracer.export()
+
+@app.post("/trace/start")
+def start_trace():
+    tracer.start()
+    return tracer.status()
+
+@app.post("/trace/stop")
+def stop_trace():
+    tracer.stop()
+    return tracer.status()
+
+@app.get("/status")
+def get_status():
+    return {
+        "running": detection_system.running,
+        "quality": detection_system.quality_controller.status(),
+        "inference_pool": detection_system.inference_pool.status() if detection_system.inference_pool else None,
+        "last_sentence": detection_system.last_sentence,
+        "tracing": tracer.status(),
+    }
+
+@app.on_event("startup")
+def startup_event():
+    global detection_system
+    detection_system = DetectionSystem(
+        model_path=r"C:\Users\Hp\Downloads\best (3).pt",
+        camera_url="http://10.200.19.164:4747/video",  # Update your camera source here or use 0 for USB webcam
+        backend="torch",  # "onnx" or "openvino" for the exported CPU backends
+        inference_workers=0  # >0 runs YOLO in worker processes fed via shared memory
+    )
+
 @app.on_event("shutdown")
 def shutdown_event():
-    detection_system.stop()
+    if detection_system is not None:
+        detection_system.stop()
     print("Shutting down backend and releasing resources")
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+"""
+Pluggable depth providers.
+
+Depth is computed lazily: depth_at() only evaluates the small patches around
+the requested pixel positions, and full_map() is only used when a consumer
+explicitly asks for a whole map. Values are relative depth in [0, 1].
+"""
+
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+import cv2
+
+
+# -------------------- BASE PROVIDER --------------------
+class DepthProvider(ABC):
+    name = "base"
+
+    @abstractmethod
+    def depth_at(self, frame, points, patch_size=7):
+        """Mean relative depth of a patch_size square around each (u, v) point"""
+
+    @abstractmethod
+    def full_map(self, frame):
+        """Relative depth for every pixel of frame"""
+
+
+def patch_bounds(points, patch_size, width, height):
+    points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+    half = patch_size // 2
+    u0 = np.clip(points[:, 0] - half, 0, width - 1)
+    v0 = np.clip(points[:, 1] - half, 0, height - 1)
+    u1 = np.clip(points[:, 0] + half + 1, 1, width)
+    v1 = np.clip(points[:, 1] + half + 1, 1, height)
+    return u0, v0, u1, v1
+
+
+# -------------------- SYNTHETIC PROVIDER --------------------
+class SyntheticDepthProvider(DepthProvider):
+    """Vertical/horizontal gradient heuristic, evaluated only where it is asked for"""
+
+    name = "synthetic"
+
+    def __init__(self, noise_sigma=0.05, smoothing=0.3):
+        self.noise_sigma = noise_sigma
+        self.smoothing = smoothing
+        self.previous_depth = None
+        self._rng = np.random.default_rng()
+
+    def _depth_values(self, rows, cols, height, width):
+        vertical = rows / max(height - 1, 1)
+        horizontal = np.abs(cols / max(width - 1, 1) - 0.5)
+        noise = self._rng.normal(0, self.noise_sigma, np.broadcast(vertical, horizontal).shape)
+        return np.clip(0.1 + 0.7 * vertical + 0.1 * horizontal + noise, 0.05, 0.95)
+
+    def depth_at(self, frame, points, patch_size=7):
+        height, width = frame.shape[:2]
+        u0, v0, u1, v1 = patch_bounds(points, patch_size, width, height)
+        depths = np.empty(len(u0), dtype=np.float32)
+        for i in range(len(u0)):
+            rows = np.arange(v0[i], v1[i], dtype=np.float32)[:, None]
+            cols = np.arange(u0[i], u1[i], dtype=np.float32)[None, :]
+            depths[i] = self._depth_values(rows, cols, height, width).mean()
+        return depths
+
+    def full_map(self, frame):
+        height, width = frame.shape[:2]
+        rows = np.arange(height, dtype=np.float32)[:, None]
+        cols = np.arange(width, dtype=np.float32)[None, :]
+        depth_map = self._depth_values(rows, cols, height, width).astype(np.float32)
+        if self.previous_depth is not None and self.previous_depth.shape == depth_map.shape:
+            depth_map = (1 - self.smoothing) * depth_map + self.smoothing * self.previous_depth
+        self.previous_depth = depth_map
+        return depth_map
+
+
+# -------------------- ONNX RUNTIME PROVIDER --------------------
+class OnnxDepthProvider(DepthProvider):
+    """
+    Monocular depth model (MiDaS-style, NCHW float input) run with ONNX
+    Runtime on CPU. The model runs at most once per frame, and only when
+    depth is actually requested.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path, input_size=256, threads=2):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.input_size = input_size
+        self._cached_frame = None
+        self._cached_map = None
+
+    def _low_res_map(self, frame):
+        # Holding the cached frame keeps its id from being reused by a later array
+        if frame is self._cached_frame and self._cached_map is not None:
+            return self._cached_map
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        resized = cv2.resize(rgb, (self.input_size, self.input_size), interpolation=cv2.INTER_AREA)
+        tensor = (resized.astype(np.float32) / 255.0 - 0.45) / 0.225
+        tensor = tensor.transpose(2, 0, 1)[None]
+        prediction = np.squeeze(self.session.run(None, {self.input_name: tensor})[0]).astype(np.float32)
+
+        # Models output inverse depth; normalise so that larger means farther
+        low, high = float(prediction.min()), float(prediction.max())
+        normalised = (prediction - low) / (high - low) if high > low else np.zeros_like(prediction)
+        self._cached_map = 1.0 - normalised
+        self._cached_frame = frame
+        return self._cached_map
+
+    def depth_at(self, frame, points, patch_size=7):
+        height, width = frame.shape[:2]
+        depth_map = self._low_res_map(frame)
+        map_height, map_width = depth_map.shape[:2]
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        scaled = points * [map_width / width, map_height / height]
+        scaled_patch = max(1, int(round(patch_size * map_width / width)))
+        u0, v0, u1, v1 = patch_bounds(scaled, scaled_patch, map_width, map_height)
+        return np.array([depth_map[v0[i]:v1[i], u0[i]:u1[i]].mean() for i in range(len(u0))], dtype=np.float32)
+
+    def full_map(self, frame):
+        height, width = frame.shape[:2]
+        return cv2.resize(self._low_res_map(frame), (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+def create_depth_provider(backend="synthetic", model_path=None):
+    """Build the configured provider, falling back to the synthetic one"""
+    if backend == "onnx":
+        if model_path and os.path.exists(model_path):
+            try:
+                return OnnxDepthProvider(model_path)
+            except Exception as e:
+                print(f"⚠️ ONNX depth backend unavailable ({e}), using synthetic depth")
+        else:
+            print(f"⚠️ Depth model not found at {model_path}, using synthetic depth")
+    return SyntheticDepthProvider()
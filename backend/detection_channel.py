@@ -0,0 +1,130 @@
+"""
+Result-only detections channel for WebSocket clients.
+
+The frame loop publishes each processed frame's detections once, from any
+thread. Messages are compact columnar JSON (boxes, classes, scores,
+distances, sides, track ids plus the frame sequence and size), so pages
+that draw their own overlays need neither server-side annotation nor a
+re-encoded frame. Every client holds only the newest message: a slow
+socket skips to the latest detections instead of queueing old ones.
+Clients choose between every frame and only frames whose scene changed.
+"""
+
+import asyncio
+import json
+import time
+
+from metrics import WEBSOCKET_FANOUT_SECONDS
+from scene_snapshot import scene_signature
+
+
+def _rounded(values, digits):
+    return [round(float(value), digits) if value is not None else None for value in values]
+
+
+def encode_detections(sequence, frame_size, objects):
+    """Columnar message for one frame; objects use the scene dict keys"""
+    width, height = frame_size
+    return {
+        "seq": sequence,
+        "ts": round(time.time(), 3),
+        "size": [int(width), int(height)],
+        "classes": [obj['class'] for obj in objects],
+        "boxes": [[int(v) for v in obj['bbox']] for obj in objects],
+        "scores": _rounded((obj['confidence'] for obj in objects), 3),
+        "distances": _rounded((obj.get('distance_meters') for obj in objects), 2),
+        "sides": [obj.get('side') for obj in objects],
+        "track_ids": [obj.get('track_id') for obj in objects],
+    }
+
+
+class DetectionClient:
+    def __init__(self, websocket, every_frame):
+        self.websocket = websocket
+        self.every_frame = every_frame
+        self.latest = None
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.skipped = 0
+        self.sender_task = None
+
+    def offer(self, message_text):
+        if self.ready.is_set():
+            self.skipped += 1
+        self.latest = message_text
+        self.ready.set()
+
+
+class DetectionChannel:
+    def __init__(self, name="detections", box_quantum=8):
+        self.name = name
+        self.box_quantum = box_quantum
+        self.clients = []
+        self.latest = None
+        self.messages_published = 0
+        self._last_signature = None
+        self._loop = None
+
+    @property
+    def client_count(self):
+        return len(self.clients)
+
+    def publish(self, sequence, frame_size, objects):
+        """Safe from any thread; encoding is skipped while nobody listens"""
+        # Overlay clients redraw on moved boxes only; distance and track changes are not a new scene
+        signature = scene_signature(objects, self.box_quantum, distance_step=None, with_tracks=False)
+        changed = signature != self._last_signature
+        self._last_signature = signature
+        loop = self._loop
+        if loop is None or not self.clients:
+            return
+        message_text = json.dumps(encode_detections(sequence, frame_size, objects), separators=(",", ":"))
+        self.latest = message_text
+        self.messages_published += 1
+        try:
+            loop.call_soon_threadsafe(self._offer, message_text, changed)
+        except RuntimeError:
+            pass
+
+    def _offer(self, message_text, changed):
+        with WEBSOCKET_FANOUT_SECONDS.time(service=self.name, channel="detections"):
+            for client in self.clients:
+                if client.every_frame or changed:
+                    client.offer(message_text)
+
+    async def register(self, websocket, every_frame=False):
+        """Attach an accepted websocket; it starts with the latest detections"""
+        self._loop = asyncio.get_running_loop()
+        client = DetectionClient(websocket, every_frame)
+        if self.latest is not None:
+            client.offer(self.latest)
+        client.sender_task = asyncio.create_task(self._send_loop(client))
+        self.clients.append(client)
+        return client
+
+    def unregister(self, websocket):
+        for client in list(self.clients):
+            if client.websocket is websocket:
+                self.clients.remove(client)
+                if client.sender_task is not None:
+                    client.sender_task.cancel()
+
+    async def _send_loop(self, client):
+        try:
+            while True:
+                await client.ready.wait()
+                client.ready.clear()
+                await client.websocket.send_text(client.latest)
+                client.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def stats(self):
+        return {
+            "clients": len(self.clients),
+            "messages_published": self.messages_published,
+            "messages_skipped": sum(client.skipped for client in self.clients),
+        }
@@ -0,0 +1,189 @@
+"""
+Detector backends for the YOLO models.
+
+load_detector() returns an object with the ultralytics YOLO call interface
+(model(frame, imgsz=..., conf=...) -> Results, model.names) backed by
+PyTorch, ONNX Runtime or OpenVINO on CPU. Exported models are cached on
+disk next to a key derived from the source checkpoint, input size and
+quantization mode, so the export only happens once per checkpoint.
+
+ONNX models can optionally be INT8 statically quantized, calibrated on a
+local folder of sample images.
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import cv2
+from ultralytics import YOLO
+
+
+BACKENDS = ("torch", "onnx", "openvino")
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_cache")
+IMAGE_EXTENSIONS = ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+
+
+# -------------------- CACHE HELPERS --------------------
+def _cache_key(model_path, backend, imgsz, int8):
+    stat = os.stat(model_path)
+    raw = f"{os.path.abspath(model_path)}|{stat.st_size}|{int(stat.st_mtime)}|{backend}|{imgsz}|{int8}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def _cache_entry(model_path, backend, imgsz, int8, cache_dir):
+    stem = os.path.splitext(os.path.basename(model_path))[0].replace(" ", "_")
+    entry = os.path.join(cache_dir, f"{stem}-{backend}{'-int8' if int8 else ''}-{_cache_key(model_path, backend, imgsz, int8)}")
+    os.makedirs(entry, exist_ok=True)
+    return entry
+
+
+def list_calibration_images(calibration_dir, limit=200):
+    paths = []
+    for pattern in IMAGE_EXTENSIONS:
+        paths.extend(glob.glob(os.path.join(calibration_dir, "**", pattern), recursive=True))
+    return sorted(paths)[:limit]
+
+
+def letterbox_tensor(image, imgsz):
+    """BGR image -> 1x3xSxS float32 tensor, resized with padding like ultralytics"""
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    resized = cv2.resize(image, (int(round(width * scale)), int(round(height * scale))), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - resized.shape[0]) // 2
+    left = (imgsz - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    rgb = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB)
+    return (rgb.astype(np.float32) / 255.0).transpose(2, 0, 1)[None]
+
+
+# -------------------- EXPORT --------------------
+def _export(model_path, export_format, imgsz, entry_dir, **kwargs):
+    """Run the ultralytics exporter once and move the artifact into the cache entry"""
+    exported = YOLO(model_path).export(format=export_format, imgsz=imgsz, dynamic=True, **kwargs)
+    target = os.path.join(entry_dir, os.path.basename(str(exported)))
+    if os.path.abspath(str(exported)) != os.path.abspath(target):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        elif os.path.exists(target):
+            os.remove(target)
+        shutil.move(str(exported), target)
+    return target
+
+
+def quantize_onnx_int8(onnx_path, output_path, calibration_dir, imgsz):
+    """Static INT8 (QDQ) quantization calibrated on local sample images"""
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    image_paths = list_calibration_images(calibration_dir)
+    if not image_paths:
+        raise FileNotFoundError(f"No calibration images found in {calibration_dir}")
+    input_name = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class ImageFolderReader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(image_paths)
+
+        def get_next(self):
+            for path in self._paths:
+                image = cv2.imread(path)
+                if image is not None:
+                    return {input_name: letterbox_tensor(image, imgsz)}
+            return None
+
+    quantize_static(
+        onnx_path, output_path, ImageFolderReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+    return output_path
+
+
+def _write_calibration_yaml(calibration_dir, entry_dir, names):
+    """Minimal dataset yaml so the OpenVINO exporter can calibrate on a plain image folder"""
+    yaml_path = os.path.join(entry_dir, "calibration.yaml")
+    lines = [f"path: {os.path.abspath(calibration_dir)}", "train: .", "val: .", "names:"]
+    lines.extend(f"  {class_id}: {class_name}" for class_id, class_name in names.items())
+    with open(yaml_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return yaml_path
+
+
+def export_model(model_path, backend, imgsz=640, int8=False, calibration_dir=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Path of the cached exported model, exporting it first if needed"""
+    if backend == "torch":
+        return model_path
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend: {backend}")
+    if int8 and not calibration_dir:
+        raise ValueError("INT8 quantization needs a calibration image folder")
+
+    entry_dir = _cache_entry(model_path, backend, imgsz, int8, cache_dir)
+
+    if backend == "onnx":
+        final_path = os.path.join(entry_dir, "model-int8.onnx" if int8 else "model.onnx")
+        if os.path.exists(final_path):
+            return final_path
+        onnx_path = _export(model_path, "onnx", imgsz, entry_dir, simplify=True)
+        if int8:
+            quantize_onnx_int8(onnx_path, final_path, calibration_dir, imgsz)
+        else:
+            os.replace(onnx_path, final_path)
+        return final_path
+
+    existing = glob.glob(os.path.join(entry_dir, "*_openvino_model"))
+    if existing:
+        return existing[0]
+    kwargs = {}
+    if int8:
+        kwargs = {"int8": True, "data": _write_calibration_yaml(calibration_dir, entry_dir, YOLO(model_path).names)}
+    return _export(model_path, "openvino", imgsz, entry_dir, **kwargs)
+
+
+# -------------------- LOADING --------------------
+def load_detector(model_path, backend="torch", imgsz=640, int8=False, calibration_dir=None,
+                  cache_dir=DEFAULT_CACHE_DIR):
+    """
+    YOLO model served by the requested backend. Falls back to the PyTorch
+    checkpoint if export or loading of the accelerated model fails.
+    """
+    if backend == "torch":
+        return YOLO(model_path)
+    try:
+        exported_path = export_model(model_path, backend, imgsz, int8, calibration_dir, cache_dir)
+        return YOLO(exported_path, task="detect")
+    except Exception as e:
+        print(f"⚠️ {backend} backend unavailable ({e}), falling back to PyTorch")
+        return YOLO(model_path)
+
+
+# -------------------- INFERENCE --------------------
+def detect_arrays(model, frame, params=None):
+    """
+    Compact (boxes Nx4 float32 xyxy, scores float32, class_ids int16) for one
+    frame. Runs in-process or as the infer_fn of an InferencePool worker,
+    so only these small arrays have to cross the process boundary.
+    """
+    params = params or {}
+    results = model(
+        frame,
+        imgsz=params.get("imgsz", 640),
+        conf=params.get("conf", 0.25),
+        iou=params.get("iou", 0.7),
+        classes=params.get("classes"),
+        verbose=False
+    )
+    if not results or results[0].boxes is None or len(results[0].boxes) == 0:
+        return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int16)
+    boxes = results[0].boxes
+    return (
+        boxes.xyxy.cpu().numpy().astype(np.float32),
+        boxes.conf.cpu().numpy().astype(np.float32),
+        boxes.cls.cpu().numpy().astype(np.int16),
+    )
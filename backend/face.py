@@ -3,7 +3,6 @@ import psycopg2
 import numpy as np
 from PIL import Image
 from imgbeddings import imgbeddings
-import pyttsx3
 import speech_recognition as sr
 import time
 import os
@@ -13,14 +12,27 @@ import threading
 import asyncio
 import json
 from concurrent.futures import ThreadPoolExecutor
-from fastapi import FastAPI, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, BackgroundTasks, WebSocket, WebSocketDisconnect, Request
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from collections import defaultdict
 import hashlib
 from typing import List
 import logging
 
+from suppression import suppress_overlaps, filter_box_sizes
+from broadcaster import FrameBroadcaster, MJPEG_MEDIA_TYPE
+from face_gallery import FaceGallery
+from face_embedder import BatchFaceEmbedder
+from face_tracks import FaceTrackCache
+from face_detector import load_face_detector, detect_face_arrays
+from inference_pool import InferencePool, PoolUnavailable
+from tracker import IoUTracker
+from gallery_sync import GallerySync, notify_persons_changed
+from speech import SpeechService
+from versioned import VersionedValue, conditional_json
+from metrics import WEBSOCKET_FANOUT_SECONDS, observe_stage, stage_timer, db_timer, metrics_response
+from tracing import get_tracer
+
 
 # -------------------- PATH SETUP --------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -47,34 +59,59 @@ executor = ThreadPoolExecutor(max_workers=4)
 
 # -------------------- GLOBAL VARIABLES --------------------
 is_page_visible = True
-active_video_clients = 0
 system_paused = False
 stranger_interaction_active = False
 stranger_processed = set()
 STRANGER_COOLDOWN_DURATION = 45
 detected_persons = set()  # Track currently detected persons
+detected_persons_state = VersionedValue(frozenset())  # Versioned copy for conditional / long-poll reads
+face_track_cache = None  # Per-track embeddings of the running pipeline
+detector_pool = None  # SSD worker processes of the running pipeline, when FACE_INFERENCE_WORKERS > 0
+
+# -------------------- GALLERY CONFIG --------------------
+GALLERY_INDEX_MODE = os.getenv("FACE_GALLERY_INDEX", "exact")  # "ivf" for galleries with thousands of identities
+GALLERY_NPROBE = int(os.getenv("FACE_GALLERY_NPROBE", "8"))  # IVF lists scanned per face: more = better recall, slower
+GALLERY_PATH = os.path.join(BASE_DIR, "model_cache", "face_gallery.npz")
+FACE_EMBED_MAX_BATCH = 16  # Faces per imgbeddings call; crowded frames are split into batches of this size
+FACE_REEMBED_INTERVAL = 15  # Frames a tracked face reuses its embedding before it is embedded again
+FACE_REEMBED_MIN_IOU = 0.6  # Re-embed sooner when the box drifts below this IoU with the embedded one
+FACE_MATCH_MARGIN = 0.03  # Re-embed every frame while the match score is this close to the threshold
+FACE_INFERENCE_WORKERS = int(os.getenv("FACE_INFERENCE_WORKERS", "0"))  # >0 runs the SSD detector in worker processes
 
 
 url = "http://10.200.19.61:8080/video"
 
 
 # -------------------- DB CONNECTION --------------------
+# The connection, embedding model and speech engine are created by init_services()
+# at startup: spawned detector workers re-import this file and must not build them
 DB_URL = os.getenv("DB_URL")
-conn = psycopg2.connect(DB_URL)
-cur = conn.cursor()
-
-
-cur.execute("""
-CREATE TABLE IF NOT EXISTS persons (
-    id SERIAL PRIMARY KEY,
-    name TEXT,
-    embedding FLOAT8[]
-)
-""")
-conn.commit()
+conn = None
+cur = None
+ibed = None
+face_embedder = None
+
+
+def init_services():
+    global conn, cur, ibed, face_embedder, speech_service
+    conn = psycopg2.connect(DB_URL)
+    cur = conn.cursor()
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS persons (
+        id SERIAL PRIMARY KEY,
+        name TEXT,
+        embedding FLOAT8[]
+    )
+    """)
+    conn.commit()
 
+    ibed = imgbeddings()
+    face_embedder = BatchFaceEmbedder(ibed, crop_size=(112, 112), max_batch=FACE_EMBED_MAX_BATCH)
+    speech_service = SpeechService(rate=180, volume=0.9, name="face")
 
-ibed = imgbeddings()
+    if face_gallery.load():
+        print(f"✅ Face gallery restored: {face_gallery.status()}")
 
 
 # -------------------- WEBSOCKET CONNECTION MANAGER --------------------
@@ -115,11 +152,13 @@ class ConnectionManager:
         async with self.connection_lock:
             connections_copy = self.active_connections.copy()
             
+        fanout_started = time.perf_counter()
         for connection in connections_copy:
             try:
                 await connection.send_text(json.dumps(data))
             except Exception as e:
                 disconnected.append(connection)
+        WEBSOCKET_FANOUT_SECONDS.observe(time.perf_counter() - fanout_started, service="face", channel="detected_persons")
         
         if disconnected:
             async with self.connection_lock:
@@ -160,11 +199,10 @@ def cleanup_processed_strangers():
         stranger_processed.discard(exp)
 
 
-def init_tts():
-    engine = pyttsx3.init()
-    engine.setProperty('rate', 180)
-    engine.setProperty('volume', 0.9)
-    return engine
+speech_service = None
+face_gallery = FaceGallery(GALLERY_INDEX_MODE, nprobe=GALLERY_NPROBE, path=GALLERY_PATH)
+gallery_sync = GallerySync(face_gallery, DB_URL, service="face")
+tracer = get_tracer("face")
 
 
 def tts_speak_threaded(text):
@@ -172,10 +210,7 @@ def tts_speak_threaded(text):
         return
         
     try:
-        engine = init_tts()
-        engine.say(text)
-        engine.runAndWait()
-        engine.stop()
+        speech_service.speak(text, wait=True)
     except Exception as e:
         print(f"⚠️ TTS error: {e}")
 
@@ -205,27 +240,6 @@ def listen_voice_threaded():
         return None
 
 
-def load_embeddings_avg():
-    cur.execute("SELECT name, embedding FROM persons")
-    rows = cur.fetchall()
-    embeddings_dict = defaultdict(list)
-    
-    for name, emb in rows:
-        embeddings_dict[name].append(np.array(emb))
-    
-    names, embeddings = [], []
-    for name, emb_list in embeddings_dict.items():
-        avg_emb = np.mean(emb_list, axis=0)
-        names.append(name)
-        embeddings.append(avg_emb)
-    
-    return names, embeddings
-
-
-def simple_cosine_similarity(a, b):
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-
-
 def enroll_new_person_threaded(person_name, face_img):
     try:
         processed_face = preprocess_face_image(face_img)
@@ -239,11 +253,14 @@ def enroll_new_person_threaded(person_name, face_img):
         img = Image.fromarray(cv2.cvtColor(processed_face, cv2.COLOR_BGR2RGB))
         emb = ibed.to_embeddings(img)[0]
         
-        cur.execute(
-            "INSERT INTO persons (name, embedding) VALUES (%s, %s)",
-            (person_name, emb.tolist())
-        )
-        conn.commit()
+        with db_timer("face", "insert_person"):
+            cur.execute(
+                "INSERT INTO persons (name, embedding) VALUES (%s, %s) RETURNING id",
+                (person_name, emb.tolist())
+            )
+            notify_persons_changed(cur, cur.fetchone()[0])
+            conn.commit()
+        gallery_sync.sync()
         
         tts_speak_threaded(f"{person_name} enrolled successfully")
         print(f"✅ {person_name} successfully enrolled!")
@@ -263,11 +280,14 @@ def save_known_stranger_threaded(face_img):
         img = Image.fromarray(cv2.cvtColor(processed_face, cv2.COLOR_BGR2RGB))
         emb = ibed.to_embeddings(img)[0]
         
-        cur.execute(
-            "INSERT INTO persons (name, embedding) VALUES (%s, %s)",
-            ("Known Stranger", emb.tolist())
-        )
-        conn.commit()
+        with db_timer("face", "insert_person"):
+            cur.execute(
+                "INSERT INTO persons (name, embedding) VALUES (%s, %s) RETURNING id",
+                ("Known Stranger", emb.tolist())
+            )
+            notify_persons_changed(cur, cur.fetchone()[0])
+            conn.commit()
+        gallery_sync.sync()
         
         tts_speak_threaded("Saved as known stranger")
         print("✅ Person saved as known stranger")
@@ -305,9 +325,6 @@ def handle_stranger_interaction_instant(face_img, face_hash):
                 
                 enroll_new_person_threaded(clean_name, face_img)
                 
-                global known_names, known_embeddings
-                known_names, known_embeddings = load_embeddings_avg()
-                
             else:
                 tts_speak_threaded("Invalid name. Saved as known stranger.")
                 save_known_stranger_threaded(face_img)
@@ -324,10 +341,9 @@ def handle_stranger_interaction_instant(face_img, face_hash):
 
 
 # -------------------- VIDEO PROCESSING --------------------
-def generate_frames():
-    global stranger_interaction_active, known_names, known_embeddings, active_video_clients, system_paused, detected_persons
-    
-    active_video_clients += 1
+def run_face_pipeline(stop_event, publish):
+    """Broadcaster producer: one camera and recognition loop shared by every viewer"""
+    global stranger_interaction_active, system_paused, detected_persons, face_track_cache, detector_pool
     
     try:
         cap = cv2.VideoCapture(url)
@@ -343,17 +359,31 @@ def generate_frames():
             print("❌ Model files not found")
             return
             
-        net = cv2.dnn.readNetFromCaffe(configFile, modelFile)
+        # The in-process network also serves frames the worker pool cannot take
+        net = load_face_detector(configFile, modelFile)
+        if FACE_INFERENCE_WORKERS > 0:
+            detector_pool = InferencePool(
+                load_face_detector, (configFile, modelFile), detect_face_arrays,
+                workers=FACE_INFERENCE_WORKERS, max_frame_shape=(480, 640, 3), name="face"
+            )
+            detector_pool.start()
+            print(f"🧵 Started {FACE_INFERENCE_WORKERS} face detector worker processes")
         
         DETECTION_CONFIDENCE = 0.6
         SIMILARITY_THRESHOLD = 0.88
         
-        known_names, known_embeddings = load_embeddings_avg()
+        gallery_sync.sync()
+        
+        face_tracker = IoUTracker(detection_interval=1, iou_threshold=0.3, max_misses=3, use_optical_flow=False)
+        face_track_cache = FaceTrackCache(
+            SIMILARITY_THRESHOLD, reembed_interval=FACE_REEMBED_INTERVAL,
+            min_box_iou=FACE_REEMBED_MIN_IOU, margin=FACE_MATCH_MARGIN
+        )
         
         frame_count = 0
         last_broadcast = 0
         
-        while active_video_clients > 0:
+        while not stop_event.is_set():
             
             if system_paused:
                 time.sleep(1)
@@ -365,12 +395,12 @@ def generate_frames():
                 
                 ret, buffer = cv2.imencode('.jpg', pause_frame)
                 if ret:
-                    frame_bytes = buffer.tobytes()
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                    publish(buffer.tobytes())
                 continue
                 
-            ret, frame = cap.read()
+            tracer.next_frame()
+            with stage_timer("face", "capture_wait"):
+                ret, frame = cap.read()
             if not ret:
                 break
                 
@@ -380,54 +410,74 @@ def generate_frames():
             if frame_count % 60 == 0:
                 cleanup_processed_strangers()
                 
-            frame_small = cv2.resize(frame, (640, 480))
+            with stage_timer("face", "preprocess"):
+                frame_small = cv2.resize(frame, (640, 480))
+                (h, w) = frame_small.shape[:2]
+            with stage_timer("face", "inference"):
+                detections = None
+                if detector_pool is not None:
+                    try:
+                        detections = detector_pool.infer(frame_small)
+                    except PoolUnavailable:
+                        pass
+                confidences, relative_boxes = detections or detect_face_arrays(net, frame_small)
             
-            (h, w) = frame_small.shape[:2]
-            blob = cv2.dnn.blobFromImage(
-                cv2.resize(frame_small, (300, 300)), 
-                1.0, (300, 300), 
-                (104.0, 177.0, 123.0)
+            postprocess_started = time.perf_counter()
+            face_boxes = (relative_boxes * np.array([w, h, w, h])).astype("int")
+            
+            valid = (
+                (confidences >= DETECTION_CONFIDENCE) &
+                (face_boxes[:, 0] >= 0) & (face_boxes[:, 1] >= 0) &
+                (face_boxes[:, 2] <= w) & (face_boxes[:, 3] <= h) &
+                filter_box_sizes(face_boxes, min_width=50, min_height=50)
+            )
+            candidate_indices = np.flatnonzero(valid)
+            keep = suppress_overlaps(
+                face_boxes[candidate_indices], confidences[candidate_indices],
+                iou_threshold=0.4, containment_threshold=0.7
             )
-            net.setInput(blob)
-            detections = net.forward()
+            observe_stage("face", "postprocess", time.perf_counter() - postprocess_started)
             
-            for i in range(detections.shape[2]):
-                confidence = detections[0, 0, i, 2]
-                if confidence < DETECTION_CONFIDENCE:
-                    continue
-                    
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                (x, y, x2, y2) = box.astype("int")
-                
-                if (x < 0 or y < 0 or x2 > w or y2 > h or 
-                    x2 <= x or y2 <= y or 
-                    (x2-x) < 50 or (y2-y) < 50):
-                    continue
-                    
-                face_img = frame_small[y:y2, x:x2]
-                if face_img.size == 0:
-                    continue
-                
-                processed_face = preprocess_face_image(face_img)
-                
-                try:
-                    pil_face = Image.fromarray(cv2.cvtColor(processed_face, cv2.COLOR_BGR2RGB))
-                    face_emb = ibed.to_embeddings(pil_face)[0]
-                    face_hash = get_face_hash(face_emb)
-                    
-                except Exception as e:
-                    continue
-                
-                best_score = -1
-                best_name = None
-                
-                for known_name, known_emb in zip(known_names, known_embeddings):
-                    score = simple_cosine_similarity(face_emb, known_emb)
-                    if score > best_score:
-                        best_score = score
-                        best_name = known_name
+            frame_face_indices = candidate_indices[keep]
+            frame_face_boxes = [tuple(int(v) for v in face_boxes[i]) for i in frame_face_indices]
+            
+            # Link faces to tracks (IoU after a constant-velocity step); only new, stale,
+            # moved or borderline tracks need a fresh embedding
+            face_tracker.predict()
+            track_ids = face_tracker.update(
+                face_boxes[frame_face_indices], confidences[frame_face_indices], np.zeros(len(frame_face_indices))
+            )
+            to_embed = [
+                index for index, (track_id, box) in enumerate(zip(track_ids, frame_face_boxes))
+                if face_track_cache.needs_embedding(track_id, box)
+            ]
+            
+            # Faces that need one are cropped into one buffer and embedded in batched calls
+            crops_by_face = {}
+            try:
+                with stage_timer("face", "embedding"):
+                    kept, face_crops, face_embs = face_embedder.embed(frame_small, [frame_face_boxes[i] for i in to_embed])
+                for k, crop, emb in zip(kept, face_crops, face_embs):
+                    face_track_cache.store(track_ids[to_embed[k]], frame_face_boxes[to_embed[k]], emb)
+                    crops_by_face[to_embed[k]] = crop
+            except Exception as e:
+                print(f"⚠️ Embedding error: {e}")
+            faces = [
+                (index, box, face_track_cache.embedding(track_ids[index]))
+                for index, box in enumerate(frame_face_boxes)
+                if index in crops_by_face or index not in to_embed
+            ]
+            
+            # Every face of the frame against every identity in one matrix multiply
+            with stage_timer("face", "match"):
+                matches = face_gallery.match([face_emb for _, _, face_emb in faces], SIMILARITY_THRESHOLD)
+            face_track_cache.advance(face_tracker.ids)
+            
+            for (index, (x, y, x2, y2), face_emb), (best_name, best_score) in zip(faces, matches):
+                face_track_cache.record_score(track_ids[index], best_score)
+                face_hash = get_face_hash(face_emb)
                 
-                if best_score >= SIMILARITY_THRESHOLD:
+                if best_name is not None:
                     name = best_name
                     color = (0, 255, 0)
                     
@@ -446,21 +496,26 @@ def generate_frames():
                         color = (0, 0, 255)
                         
                         if not stranger_interaction_active and not system_paused:
+                            processed_face = crops_by_face.get(index)
+                            if processed_face is None:
+                                processed_face = preprocess_face_image(frame_small[y:y2, x:x2])
                             threading.Thread(
                                 target=handle_stranger_interaction_instant,
                                 args=(processed_face.copy(), face_hash),
                                 daemon=True
                             ).start()
                 
-                cv2.rectangle(frame_small, (x, y), (x2, y2), color, 2)
-                
-                label = f"{name} ({best_score:.2f})"
-                cv2.putText(frame_small, label, (x, y - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+                with stage_timer("face", "annotate"):
+                    cv2.rectangle(frame_small, (x, y), (x2, y2), color, 2)
+                    
+                    label = f"{name} ({best_score:.2f})"
+                    cv2.putText(frame_small, label, (x, y - 10),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
             
             # Update detected persons and broadcast if changed
             if current_detected != detected_persons:
                 detected_persons = current_detected.copy()
+                detected_persons_state.set(frozenset(detected_persons))
                 # Broadcast to WebSocket clients
                 try:
                     loop = asyncio.new_event_loop()
@@ -470,18 +525,26 @@ def generate_frames():
                 except:
                     pass
             
-            ret, buffer = cv2.imencode('.jpg', frame_small)
+            with stage_timer("face", "encode"):
+                ret, buffer = cv2.imencode('.jpg', frame_small)
             if ret:
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                publish(buffer.tobytes())
         
         cap.release()
         
     except Exception as e:
         print(f"❌ Camera error: {e}")
     finally:
-        active_video_clients -= 1
+        if detector_pool is not None:
+            detector_pool.stop()
+            detector_pool = None
+
+
+frame_broadcaster = FrameBroadcaster(run_face_pipeline, name="face")
+
+
+def generate_frames():
+    return frame_broadcaster.stream()
 
 
 # -------------------- WEBSOCKET ENDPOINT --------------------
@@ -513,13 +576,38 @@ async def websocket_detected_persons(websocket: WebSocket):
 async def video_feed():
     return StreamingResponse(
         generate_frames(),
-        media_type="multipart/x-mixed-replace; boundary=frame"
+        media_type=MJPEG_MEDIA_TYPE
     )
 
 
 @app.get("/api/detected_persons")
-async def get_detected_persons():
-    return {"detected_persons": list(detected_persons)}
+async def get_detected_persons(request: Request, since: int = None, wait: float = 0.0):
+    """304 for an unchanged If-None-Match / ?since=; ?wait=<seconds> long-polls for a change"""
+    return await conditional_json(
+        request, detected_persons_state.notifier,
+        lambda: {"detected_persons": sorted(detected_persons_state.value), "version": detected_persons_state.version},
+        "persons", since, wait
+    )
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics_response()
+
+@app.get("/trace")
+async def get_trace():
+    """Chrome / Perfetto trace-event JSON for the most recent traced frames"""
+    return tracer.export()
+
+@app.post("/trace/start")
+async def start_trace():
+    tracer.start()
+    return tracer.status()
+
+@app.post("/trace/stop")
+async def stop_trace():
+    tracer.stop()
+    return tracer.status()
 
 
 @app.post("/api/resume-system")
@@ -542,14 +630,35 @@ async def get_status():
         "processed_strangers": len(stranger_processed),
         "active_connections": len(manager.active_connections),
         "similarity_threshold": 0.88,
-        "known_persons": len([n for n in known_names if n != 'Known Stranger']) if 'known_names' in globals() else 0,
+        "known_persons": len([n for n in face_gallery.names if n != 'Known Stranger']),
         "page_visible": is_page_visible,
         "system_paused": system_paused,
-        "active_video_clients": active_video_clients,
-        "detected_persons": list(detected_persons)
+        "active_video_clients": frame_broadcaster.subscriber_count,
+        "detected_persons": list(detected_persons),
+        "gallery": {**face_gallery.status(), "sync": gallery_sync.status()},
+        "embedding": face_embedder.status(),
+        "face_tracks": face_track_cache.status() if face_track_cache else None,
+        "detector_pool": detector_pool.status() if detector_pool else None,
+        "tracing": tracer.status()
     }
 
 
+# -------------------- STARTUP / CLEANUP --------------------
+@app.on_event("startup")
+async def startup_event():
+    # Applies only rows added since the saved gallery, then follows other processes' inserts
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(executor, init_services)
+    await loop.run_in_executor(executor, gallery_sync.validate)
+    await loop.run_in_executor(executor, gallery_sync.sync)
+    gallery_sync.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    gallery_sync.stop()
+    frame_broadcaster.stop()
+
+
 if __name__ == "__main__":
     import uvicorn
     print("⚡ FACE RECOGNITION SYSTEM STARTING ⚡")
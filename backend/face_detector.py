@@ -0,0 +1,28 @@
+"""
+Res10 SSD face detection that can run in-process or in InferencePool workers.
+
+Only cv2 and NumPy are imported here, so spawned workers load the Caffe
+network without re-running face.py's database, embedding and speech setup.
+"""
+
+import cv2
+import numpy as np
+
+
+SSD_INPUT_SIZE = (300, 300)
+SSD_MEAN = (104.0, 177.0, 123.0)
+
+
+def load_face_detector(config_path, model_path):
+    return cv2.dnn.readNetFromCaffe(config_path, model_path)
+
+
+def detect_face_arrays(net, frame, params=None):
+    """(confidences float32, boxes Nx4 float32 in 0..1 xyxy) for one BGR frame"""
+    blob = cv2.dnn.blobFromImage(cv2.resize(frame, SSD_INPUT_SIZE), 1.0, SSD_INPUT_SIZE, SSD_MEAN)
+    net.setInput(blob)
+    detections = net.forward()
+    return (
+        detections[0, 0, :, 2].astype(np.float32),
+        detections[0, 0, :, 3:7].astype(np.float32),
+    )
@@ -0,0 +1,71 @@
+"""
+Batched face embedding for one frame.
+
+All valid face crops of a frame are resized straight into a preallocated
+crop buffer, converted to RGB in a second buffer, and embedded with one
+model call per max_batch faces instead of one call per face. The buffers
+grow only when a frame has more faces than ever before; the crops handed
+back are views into them and stay valid until the next embed() call.
+"""
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+class BatchFaceEmbedder:
+    def __init__(self, ibed, crop_size=(112, 112), max_batch=16):
+        self.ibed = ibed
+        self.crop_size = crop_size
+        self.max_batch = max(1, max_batch)
+        self._crops = None
+        self._rgb = None
+        self.batches = 0
+        self.faces = 0
+
+    def _ensure_capacity(self, count):
+        if self._crops is not None and len(self._crops) >= count:
+            return
+        capacity = max(count, self.max_batch, 2 * (len(self._crops) if self._crops is not None else 0))
+        width, height = self.crop_size
+        self._crops = np.empty((capacity, height, width, 3), dtype=np.uint8)
+        self._rgb = np.empty_like(self._crops)
+
+    def embed(self, frame, boxes):
+        """
+        Crop, resize and embed every (x, y, x2, y2) box of frame.
+        Returns (kept, crops, embeddings): indices into boxes that had a
+        non-empty crop, their BGR crops (N x h x w x 3) and embeddings (N x D).
+        """
+        self._ensure_capacity(len(boxes))
+        kept = []
+        for index, (x, y, x2, y2) in enumerate(boxes):
+            face_img = frame[y:y2, x:x2]
+            if face_img.size == 0:
+                continue
+            slot = len(kept)
+            cv2.resize(face_img, self.crop_size, dst=self._crops[slot])
+            cv2.cvtColor(self._crops[slot], cv2.COLOR_BGR2RGB, dst=self._rgb[slot])
+            kept.append(index)
+
+        count = len(kept)
+        crops = self._crops[:count]
+        if count == 0:
+            return kept, crops, np.empty((0, 0), dtype=np.float32)
+
+        embeddings = []
+        for start in range(0, count, self.max_batch):
+            batch = [Image.fromarray(rgb) for rgb in self._rgb[start:min(start + self.max_batch, count)]]
+            # batch_size above the batch length keeps imgbeddings on its single-call path
+            embeddings.append(self.ibed.to_embeddings(batch, batch_size=len(batch) + 1))
+            self.batches += 1
+        self.faces += count
+        return kept, crops, np.vstack(embeddings)
+
+    def status(self):
+        return {
+            "max_batch": self.max_batch,
+            "buffer_faces": len(self._crops) if self._crops is not None else 0,
+            "batches": self.batches,
+            "faces": self.faces,
+        }
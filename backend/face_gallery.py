@@ -0,0 +1,375 @@
+"""
+Face gallery matched with one matrix multiply, with an optional IVF index.
+
+Each enrolled name is one row: the running sum of its embeddings, kept
+L2-normalized as a contiguous float32 matrix with a parallel name array.
+The normalized sum has the same direction as the mean, so adding an
+embedding is O(dim) instead of re-averaging every row of the name.
+
+index_mode="exact" scores every query against every row in one
+(faces x dim) @ (dim x identities) product. index_mode="ivf" clusters the
+rows into nlist inverted lists with spherical k-means and only scores the
+rows of the nprobe closest lists: raise nprobe for recall, lower it for
+latency. Galleries smaller than min_index_rows are always searched
+exactly. save()/load() persist rows, sums and the trained lists so a
+restart does not re-cluster.
+
+version is the highest source version (e.g. database row id) folded in so
+far; it is saved with the gallery so a restart only has to apply what
+came after it. Versions that are not applied in order are also
+remembered individually (recent versions) until forget_versions_below(),
+so a source can re-scan a trailing window without double counting.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+
+def normalize_rows(vectors):
+    """float32 copy of vectors (N x D) with unit-length rows; zero rows stay zero"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.size == 0:
+        return np.empty((0, vectors.shape[-1] if vectors.ndim == 2 else 0), dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(vectors / norms, dtype=np.float32)
+
+
+def _top_k(scores, k):
+    """(scores, columns) of the k largest entries per row, best first"""
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+# -------------------- IVF INDEX --------------------
+class IVFIndex:
+    """Inverted lists over gallery rows; rows are referenced by their gallery position"""
+
+    def __init__(self, nlist=None, nprobe=8):
+        self.requested_nlist = nlist
+        self.nprobe = nprobe
+        self.centroids = None
+        self.lists = []
+        self.assignment = {}
+        self.trained_rows = 0
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def train(self, matrix, iterations=8, seed=0, max_samples_per_list=64):
+        """Spherical k-means on (a sample of) matrix, then assign every row"""
+        rows = len(matrix)
+        nlist = self.requested_nlist or int(np.sqrt(rows))
+        nlist = max(1, min(nlist, rows))
+        rng = np.random.default_rng(seed)
+        sample = matrix
+        if rows > nlist * max_samples_per_list:
+            sample = matrix[rng.choice(rows, nlist * max_samples_per_list, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+        self.centroids = centroids
+        self.trained_rows = rows
+        self.lists = [[] for _ in range(nlist)]
+        self.assignment = {}
+        for row, list_id in enumerate(np.argmax(matrix @ centroids.T, axis=1)):
+            self.lists[list_id].append(row)
+            self.assignment[row] = int(list_id)
+
+    def place(self, row, vector):
+        """Insert a new row or move an updated one to its closest list"""
+        list_id = int(np.argmax(self.centroids @ vector))
+        previous = self.assignment.get(row)
+        if previous == list_id:
+            return
+        if previous is not None:
+            self.lists[previous].remove(row)
+        self.lists[list_id].append(row)
+        self.assignment[row] = list_id
+
+    def candidates(self, query, nprobe=None):
+        """Gallery rows in the nprobe lists closest to query"""
+        nprobe = min(nprobe or self.nprobe, len(self.lists))
+        closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows = [row for list_id in closest for row in self.lists[list_id]]
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def state(self):
+        assignment = np.full(len(self.assignment), -1, dtype=np.int32)
+        for row, list_id in self.assignment.items():
+            assignment[row] = list_id
+        return self.centroids, assignment
+
+    def restore(self, centroids, assignment, trained_rows):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.trained_rows = int(trained_rows)
+        self.lists = [[] for _ in range(len(self.centroids))]
+        self.assignment = {}
+        for row, list_id in enumerate(assignment):
+            self.lists[int(list_id)].append(row)
+            self.assignment[row] = int(list_id)
+
+
+# -------------------- GALLERY --------------------
+class FaceGallery:
+    def __init__(self, index_mode="exact", nlist=None, nprobe=8, min_index_rows=1024,
+                 retrain_growth=4.0, path=None):
+        if index_mode not in ("exact", "ivf"):
+            raise ValueError(f"Unknown gallery index mode: {index_mode}")
+        self.index_mode = index_mode
+        self.min_index_rows = min_index_rows
+        self.retrain_growth = retrain_growth
+        self.path = path
+        self.index = IVFIndex(nlist, nprobe) if index_mode == "ivf" else None
+        self._lock = threading.Lock()
+        self.version = 0
+        self._versions = set()
+        self._reset(0)
+
+    def _reset(self, dim, capacity=0):
+        self._size = 0
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._sums = np.zeros((capacity, dim), dtype=np.float32)
+        self._counts = np.zeros(capacity, dtype=np.int64)
+        self._names = np.empty(capacity, dtype=object)
+        self._rows = {}
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def names(self):
+        return list(self._names[:self._size])
+
+    @property
+    def total_count(self):
+        """Number of embeddings folded into the gallery"""
+        return int(self._counts[:self._size].sum())
+
+    @property
+    def dim(self):
+        return self._matrix.shape[1]
+
+    @property
+    def nprobe(self):
+        return self.index.nprobe if self.index else None
+
+    @nprobe.setter
+    def nprobe(self, value):
+        if self.index:
+            self.index.nprobe = max(1, int(value))
+
+    # -------------------- UPDATES --------------------
+    def replace(self, names, embeddings, counts=None, version=0):
+        """
+        Load every identity at once (one mean embedding per name, with
+        counts for later incremental adds). A trained IVF index keeps its
+        lists and only re-assigns rows unless the gallery has outgrown it.
+        """
+        names = list(names)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(embeddings) != len(names):
+            raise ValueError(f"{len(names)} names but {len(embeddings)} embeddings")
+        counts = np.ones(len(names), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        with self._lock:
+            self._reset(embeddings.shape[1] if len(names) else self.dim, len(names))
+            self.version = version
+            self._versions = set()
+            if not names:
+                return
+            self._size = len(names)
+            self._sums[:] = embeddings * counts[:, None]
+            self._counts[:] = counts
+            self._matrix[:] = normalize_rows(self._sums)
+            self._names[:] = names
+            self._rows = {name: row for row, name in enumerate(names)}
+            self._refresh_index()
+
+    def add(self, name, embedding, version=None):
+        """Fold one more embedding into name's row (a new row for a new name); O(dim)"""
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        with self._lock:
+            if version is not None:
+                self.version = max(self.version, version)
+                self._versions.add(version)
+            if self._size == 0 and self.dim != len(embedding):
+                self._reset(len(embedding))
+            row = self._rows.get(name)
+            if row is None:
+                row = self._append_row(name)
+            self._sums[row] += embedding
+            self._counts[row] += 1
+            self._matrix[row] = normalize_rows(self._sums[row])[0]
+            if self.index is not None and self.index.trained:
+                self.index.place(row, self._matrix[row])
+                if self._size >= self.index.trained_rows * self.retrain_growth:
+                    self._refresh_index(retrain=True)
+            else:
+                self._refresh_index()
+
+    def has_version(self, version):
+        return version in self._versions
+
+    def forget_versions_below(self, version):
+        with self._lock:
+            self._versions = {applied for applied in self._versions if applied >= version}
+
+    def _append_row(self, name):
+        if self._size == len(self._names):
+            capacity = max(16, 2 * len(self._names))
+            self._matrix = self._grown(self._matrix, capacity)
+            self._sums = self._grown(self._sums, capacity)
+            self._counts = self._grown(self._counts, capacity)
+            self._names = self._grown(self._names, capacity)
+        row = self._size
+        self._names[row] = name
+        self._rows[name] = row
+        self._size += 1
+        return row
+
+    def _grown(self, array, capacity):
+        # Readers keep slicing the old array, so growing never mutates what they hold
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype) if array.dtype != object \
+            else np.empty(capacity, dtype=object)
+        grown[:self._size] = array[:self._size]
+        return grown
+
+    def _refresh_index(self, retrain=False):
+        if self.index is None or self._size < self.min_index_rows:
+            return
+        matrix = self._matrix[:self._size]
+        if retrain or not self.index.trained or len(self.index.centroids[0]) != matrix.shape[1]:
+            self.index.train(matrix)
+        else:
+            self.index.lists = [[] for _ in range(len(self.index.centroids))]
+            self.index.assignment = {}
+            for row in range(self._size):
+                self.index.place(row, matrix[row])
+
+    # -------------------- SEARCH --------------------
+    def snapshot(self):
+        with self._lock:
+            return self._matrix[:self._size], self._names[:self._size]
+
+    def search(self, queries, k=1, nprobe=None):
+        """
+        Top-k identities per query embedding, best first.
+        Returns (scores, names): float32 (Q x k) and object (Q x k), k capped at the gallery size.
+        """
+        queries = normalize_rows(queries)
+        with self._lock:
+            matrix, names = self._matrix[:self._size], self._names[:self._size]
+            use_index = self.index is not None and self.index.trained and self._size >= self.min_index_rows
+            candidates = [self.index.candidates(query, nprobe) for query in queries] if use_index else None
+        if len(names) == 0 or len(queries) == 0:
+            return np.empty((len(queries), 0), dtype=np.float32), np.empty((len(queries), 0), dtype=object)
+        if candidates is None:
+            top_scores, top = _top_k(queries @ matrix.T, k)
+            return top_scores, names[top]
+
+        k = min(k, len(names))
+        all_scores = np.full((len(queries), k), -1.0, dtype=np.float32)
+        all_names = np.full((len(queries), k), None, dtype=object)
+        for index, (query, rows) in enumerate(zip(queries, candidates)):
+            if len(rows) == 0:
+                continue
+            top_scores, top = _top_k((matrix[rows] @ query)[None, :], k)
+            all_scores[index, :top.shape[1]] = top_scores[0]
+            all_names[index, :top.shape[1]] = names[rows[top[0]]]
+        return all_scores, all_names
+
+    def match(self, queries, threshold):
+        """
+        Best identity per query: list of (name or None, score).
+        name is None when the best score is below threshold; score is -1.0 for an empty gallery.
+        """
+        scores, names = self.search(queries, k=1)
+        if scores.shape[1] == 0:
+            return [(None, -1.0)] * len(scores)
+        return [
+            (name if name is not None and score >= threshold else None, float(score))
+            for name, score in zip(names[:, 0], scores[:, 0])
+        ]
+
+    # -------------------- PERSISTENCE --------------------
+    def save(self, path=None):
+        """Write rows, sums and IVF lists atomically; no-op without a path"""
+        path = path or self.path
+        if not path:
+            return False
+        with self._lock:
+            size = self._size
+            state = {
+                "names": np.array([str(name) for name in self._names[:size]], dtype=str),
+                "sums": self._sums[:size].copy(),
+                "counts": self._counts[:size].copy(),
+                "version": np.array(self.version),
+                "recent_versions": np.array(sorted(self._versions), dtype=np.int64),
+            }
+            if self.index is not None and self.index.trained:
+                centroids, assignment = self.index.state()
+                state.update(centroids=centroids, assignment=assignment,
+                             trained_rows=np.array(self.index.trained_rows))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.tmp.npz"
+        np.savez(temp_path, **state)
+        os.replace(temp_path, path)
+        return True
+
+    def load(self, path=None):
+        """Restore a saved gallery; False when there is nothing usable at path"""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return False
+        with np.load(path, allow_pickle=False) as data:
+            names = [str(name) for name in data["names"]]
+            sums = data["sums"]
+            counts = data["counts"]
+            version = int(data["version"]) if "version" in data else 0
+            if "version" in data and "recent_versions" not in data:
+                # Saved before out-of-order versions were tracked; a re-scan would double count
+                return False
+            recent_versions = set(int(v) for v in data["recent_versions"]) if "recent_versions" in data else set()
+            ivf_state = (data["centroids"], data["assignment"], data["trained_rows"]) if "centroids" in data else None
+        with self._lock:
+            self._reset(sums.shape[1] if len(names) else 0, len(names))
+            self._size = len(names)
+            self._sums[:] = sums
+            self._counts[:] = counts
+            self._matrix[:] = normalize_rows(sums)
+            self._names[:] = names
+            self._rows = {name: row for row, name in enumerate(names)}
+            self.version = version
+            self._versions = recent_versions
+            if self.index is not None:
+                if ivf_state is not None and len(ivf_state[1]) == len(names):
+                    self.index.restore(*ivf_state)
+                else:
+                    self._refresh_index()
+        return True
+
+    def status(self):
+        status = {"mode": self.index_mode, "identities": self._size, "dim": self.dim, "version": self.version}
+        if self.index is not None:
+            status.update(
+                indexed=self.index.trained and self._size >= self.min_index_rows,
+                nlist=len(self.index.lists),
+                nprobe=self.index.nprobe,
+            )
+        return status
@@ -0,0 +1,87 @@
+"""
+Per-track embedding cache for face recognition.
+
+The face detector still runs every frame and IoUTracker links its boxes
+into tracks (IoU after a constant-velocity step). Each track keeps the
+embedding of its last crop, and the expensive embedding model only runs
+for a track when:
+
+    - it is new,
+    - reembed_interval frames have passed since its last embedding,
+    - its box moved or resized enough that IoU with the embedded box
+      dropped below min_box_iou, or
+    - its last match score was within margin of the threshold.
+
+Cached embeddings are still matched against the gallery every frame (one
+matrix multiply), so enrollments show up without re-embedding anyone.
+"""
+
+import numpy as np
+
+from suppression import pairwise_iou
+
+
+class _TrackEntry:
+    __slots__ = ("embedding", "box", "frames_since_embedding", "score")
+
+    def __init__(self, embedding, box):
+        self.embedding = embedding
+        self.box = box
+        self.frames_since_embedding = 0
+        self.score = None
+
+
+class FaceTrackCache:
+    def __init__(self, threshold, reembed_interval=15, min_box_iou=0.6, margin=0.03):
+        self.threshold = threshold
+        self.reembed_interval = reembed_interval
+        self.min_box_iou = min_box_iou
+        self.margin = margin
+        self._entries = {}
+        self.embedded = 0
+        self.reused = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def needs_embedding(self, track_id, box):
+        entry = self._entries.get(track_id)
+        if entry is None or entry.frames_since_embedding >= self.reembed_interval:
+            return True
+        if entry.score is not None and abs(entry.score - self.threshold) < self.margin:
+            return True
+        iou = pairwise_iou(np.asarray([entry.box], dtype=np.float32), np.asarray([box], dtype=np.float32))
+        if float(iou[0, 0]) < self.min_box_iou:
+            return True
+        self.reused += 1
+        return False
+
+    def store(self, track_id, box, embedding):
+        self._entries[track_id] = _TrackEntry(embedding, tuple(box))
+        self.embedded += 1
+
+    def embedding(self, track_id):
+        return self._entries[track_id].embedding
+
+    def record_score(self, track_id, score):
+        entry = self._entries.get(track_id)
+        if entry is not None:
+            entry.score = score
+
+    def advance(self, live_track_ids):
+        """End of frame: age every entry and forget tracks the tracker dropped"""
+        live = set(int(track_id) for track_id in live_track_ids)
+        for track_id in list(self._entries):
+            if track_id not in live:
+                del self._entries[track_id]
+            else:
+                self._entries[track_id].frames_since_embedding += 1
+
+    def status(self):
+        total = self.embedded + self.reused
+        return {
+            "tracks": len(self._entries),
+            "embedded": self.embedded,
+            "reused": self.reused,
+            "reuse_ratio": round(self.reused / total, 3) if total else 0.0,
+        }
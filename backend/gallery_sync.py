@@ -0,0 +1,183 @@
+"""
+Keeps a FaceGallery in step with the persons table without full scans.
+
+persons rows are append-only and their SERIAL id is the version: the
+gallery remembers the highest id it has folded in (and persists it with
+the gallery file), so a sync only looks at rows near or above it and adds
+each new one to its name's running sum. Ids come from a sequence, not
+from commit order: a writer can take id N and commit after another
+writer's N+1. Each sync therefore re-scans the last sync_window ids below
+the version and applies any id the gallery has not seen yet.
+
+Writers send NOTIFY persons_changed after an insert; every process
+LISTENs on its own connection and syncs when woken, and also every
+poll_interval seconds in case a writer did not notify. validate() checks
+a saved gallery against the table at startup and rebuilds it when the
+table no longer matches (recreated, or rows deleted).
+
+Rewriting the gallery file is not cheap, so once start() has run saves
+happen on a background thread, at most once per save_delay seconds
+however many rows arrive in between; stop() writes any pending save.
+"""
+
+import select
+import threading
+import time
+
+import psycopg2
+
+from metrics import db_timer
+
+
+NOTIFY_CHANNEL = "persons_changed"
+DEFAULT_SYNC_WINDOW = 256
+DEFAULT_SAVE_DELAY = 5.0
+
+
+def notify_persons_changed(cur, person_id):
+    """Queue the change notification inside the writer's transaction; it is sent on commit"""
+    cur.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, str(person_id)))
+
+
+class GallerySync:
+    def __init__(self, gallery, dsn, poll_interval=30.0, sync_window=DEFAULT_SYNC_WINDOW,
+                 save_delay=DEFAULT_SAVE_DELAY, service="face"):
+        self.gallery = gallery
+        self.dsn = dsn
+        self.poll_interval = poll_interval
+        self.sync_window = sync_window
+        self.save_delay = save_delay
+        self.service = service
+        self.rows_applied = 0
+        self.saves = 0
+        self.notifications = 0
+        self.last_sync = None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._save_requested = threading.Event()
+        self._saver = None
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(self.dsn)
+            self._conn.autocommit = True
+            with self._conn.cursor() as cur:
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        return self._conn
+
+    def validate(self):
+        """Rebuild the gallery from scratch when its saved state does not match the table; True if kept"""
+        with self._lock:
+            with db_timer(self.service, "validate_gallery"):
+                with self._connection().cursor() as cur:
+                    cur.execute(
+                        "SELECT count(*), coalesce(max(id), 0) FROM persons WHERE id <= %s",
+                        (self.gallery.version,)
+                    )
+                    folded_rows, max_id = cur.fetchone()
+            if (folded_rows, max_id) == (self.gallery.total_count, self.gallery.version):
+                return True
+            print(f"⚠️ Saved face gallery does not match the persons table "
+                  f"({self.gallery.total_count} embeddings up to id {self.gallery.version}, "
+                  f"table has {folded_rows} up to id {max_id}); rebuilding")
+            self.gallery.replace([], [], version=0)
+            return False
+
+    def sync(self):
+        """Fold persons rows the gallery has not seen yet into it; returns how many"""
+        with self._lock:
+            low_watermark = max(0, self.gallery.version - self.sync_window)
+            with db_timer(self.service, "sync_gallery"):
+                with self._connection().cursor() as cur:
+                    cur.execute("SELECT id FROM persons WHERE id > %s", (low_watermark,))
+                    missing = sorted(person_id for (person_id,) in cur.fetchall()
+                                     if not self.gallery.has_version(person_id))
+                    rows = []
+                    if missing:
+                        cur.execute(
+                            "SELECT id, name, embedding FROM persons WHERE id = ANY(%s) ORDER BY id",
+                            (missing,)
+                        )
+                        rows = cur.fetchall()
+            for person_id, name, embedding in rows:
+                self.gallery.add(name, embedding, version=person_id)
+            self.gallery.forget_versions_below(self.gallery.version - self.sync_window)
+            self.rows_applied += len(rows)
+            self.last_sync = time.time()
+        if rows:
+            self._request_save()
+        return len(rows)
+
+    # -------------------- SAVING --------------------
+    def _request_save(self):
+        self._save_requested.set()
+        if self._saver is None or not self._saver.is_alive():
+            self.flush()
+
+    def flush(self):
+        """Write the gallery now if a save is pending"""
+        if self._save_requested.is_set():
+            self._save_requested.clear()
+            self.gallery.save()
+            self.saves += 1
+
+    def _save_loop(self):
+        while not self._stop_event.is_set():
+            if not self._save_requested.wait(timeout=1.0):
+                continue
+            # Rows synced during the delay are written by this same save
+            self._stop_event.wait(self.save_delay)
+            self.flush()
+
+    # -------------------- LISTENER --------------------
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._listen_loop, name=f"{self.service}-gallery-sync", daemon=True)
+        self._thread.start()
+        self._saver = threading.Thread(target=self._save_loop, name=f"{self.service}-gallery-save", daemon=True)
+        self._saver.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if self._saver is not None:
+            self._saver.join(timeout=2.0)
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _listen_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                conn = self._connection()
+                readable, _, _ = select.select([conn], [], [], self.poll_interval)
+                if readable:
+                    conn.poll()
+                    self.notifications += len(conn.notifies)
+                    conn.notifies.clear()
+                self.sync()
+            except Exception as e:
+                print(f"⚠️ Gallery sync error: {e}")
+                with self._lock:
+                    if self._conn is not None:
+                        self._conn.close()
+                        self._conn = None
+                self._stop_event.wait(5.0)
+
+    def status(self):
+        return {
+            "version": self.gallery.version,
+            "rows_applied": self.rows_applied,
+            "notifications": self.notifications,
+            "saves": self.saves,
+            "save_pending": self._save_requested.is_set(),
+            "last_sync": self.last_sync,
+            "listening": self._thread is not None and self._thread.is_alive(),
+        }
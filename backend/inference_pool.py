@@ -0,0 +1,222 @@
+"""
+Process-pool inference workers fed through a shared-memory frame ring.
+
+Model inference runs in separate processes so it is not serialized with
+drawing, encoding and the FastAPI event loop under one GIL. Frames are
+written once into a multiprocessing.shared_memory ring and workers read
+them in place; only a small task tuple crosses the queue in, and compact
+NumPy result arrays come back out.
+
+init_fn(*init_args) and infer_fn(model, frame, params) must be top-level
+functions so they can be sent to spawned workers.
+
+infer() raises PoolUnavailable whenever a frame cannot go to a worker:
+before any worker has loaded its model, for frames larger than a ring
+slot, and for good once a worker failed to load, died or stopped
+answering. Callers then run the frame in-process.
+"""
+
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class PoolUnavailable(RuntimeError):
+    """The frame was not dispatched; run it in-process instead"""
+
+
+# -------------------- SHARED FRAME RING --------------------
+class SharedFrameRing:
+    def __init__(self, slot_count, slot_bytes, name=None, create=True):
+        self.slot_count = slot_count
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=slot_count * slot_bytes)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def view(self, slot, shape, dtype=np.uint8):
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot, frame):
+        self.view(slot, frame.shape, frame.dtype)[...] = frame
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _worker_main(ring_name, slot_count, slot_bytes, init_fn, init_args, infer_fn, tasks, results):
+    ring = SharedFrameRing(slot_count, slot_bytes, name=ring_name, create=False)
+    try:
+        try:
+            model = init_fn(*init_args)
+        except Exception as e:
+            results.put(("failed", os.getpid(), None, repr(e)))
+            return
+        results.put(("ready", os.getpid(), None, None))
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            ticket, slot, shape, dtype, params = task
+            frame = ring.view(slot, shape, dtype)
+            try:
+                results.put(("ok", ticket, slot, infer_fn(model, frame, params)))
+            except Exception as e:
+                results.put(("error", ticket, slot, repr(e)))
+    finally:
+        ring.close()
+
+
+# -------------------- POOL --------------------
+class InferencePool:
+    def __init__(self, init_fn, init_args, infer_fn, workers=2, max_frame_shape=(720, 1280, 3),
+                 slots_per_worker=2, name="inference"):
+        self.init_fn = init_fn
+        self.init_args = tuple(init_args)
+        self.infer_fn = infer_fn
+        self.workers = workers
+        self.name = name
+        self.slot_count = max(2, workers * slots_per_worker)
+        self.slot_bytes = int(np.prod(max_frame_shape))
+
+        self._ring = None
+        self._processes = []
+        self._tasks = None
+        self._results = None
+        self._collector = None
+        self._free_slots = queue.Queue()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._tickets = itertools.count(1)
+        self.ready_workers = 0
+        self.failure = None
+
+    @property
+    def running(self):
+        return bool(self._processes)
+
+    def start(self):
+        if self.running:
+            return
+        self.failure = None
+        context = mp.get_context("spawn")
+        self._ring = SharedFrameRing(self.slot_count, self.slot_bytes)
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        for slot in range(self.slot_count):
+            self._free_slots.put(slot)
+        for index in range(self.workers):
+            process = context.Process(
+                target=_worker_main,
+                args=(self._ring.name, self.slot_count, self.slot_bytes, self.init_fn,
+                      self.init_args, self.infer_fn, self._tasks, self._results),
+                name=f"{self.name}-worker-{index}", daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+        self._collector = threading.Thread(target=self._collect_results, name=f"{self.name}-collector", daemon=True)
+        self._collector.start()
+
+    def infer(self, frame, params=None, timeout=5.0):
+        """Run infer_fn on a worker; blocks this thread only, not the GIL"""
+        self._check_workers()
+        frame = np.ascontiguousarray(frame)
+        if frame.nbytes > self.slot_bytes:
+            raise PoolUnavailable(f"Frame of {frame.nbytes} bytes does not fit a {self.slot_bytes}-byte slot")
+        try:
+            slot = self._free_slots.get(timeout=timeout)
+        except queue.Empty:
+            self._mark_broken(f"no free frame slot within {timeout}s")
+            raise PoolUnavailable(self.failure)
+
+        ticket = next(self._tickets)
+        done = threading.Event()
+        entry = {"done": done, "status": None, "result": None}
+        with self._pending_lock:
+            self._pending[ticket] = entry
+
+        self._ring.write(slot, frame)
+        self._tasks.put((ticket, slot, frame.shape, frame.dtype.str, params))
+        if not done.wait(timeout):
+            # The slot is released by the collector whenever the late result arrives
+            with self._pending_lock:
+                self._pending.pop(ticket, None)
+            self._mark_broken(f"no answer within {timeout}s")
+            raise PoolUnavailable(self.failure)
+        if entry["status"] == "error":
+            raise RuntimeError(entry["result"])
+        return entry["result"]
+
+    def _check_workers(self):
+        if self.failure is None and self.running:
+            dead = [process.name for process in self._processes if not process.is_alive()]
+            if dead:
+                self._mark_broken(f"{', '.join(dead)} exited")
+        if self.failure is not None:
+            raise PoolUnavailable(self.failure)
+        if not self.running or self.ready_workers == 0:
+            raise PoolUnavailable(f"{self.name} workers are still loading")
+
+    def _mark_broken(self, reason):
+        with self._pending_lock:
+            if self.failure is not None:
+                return
+            self.failure = reason
+        print(f"⚠️ {self.name} inference pool disabled ({reason}); running in-process")
+
+    def _collect_results(self):
+        while self.running:
+            try:
+                status, ticket, slot, result = self._results.get(timeout=0.5)
+            except (queue.Empty, EOFError, OSError):
+                continue
+            if status == "ready":
+                self.ready_workers += 1
+                continue
+            if status == "failed":
+                self._mark_broken(f"worker {ticket} could not load its model: {result}")
+                continue
+            self._free_slots.put(slot)
+            with self._pending_lock:
+                entry = self._pending.pop(ticket, None)
+            if entry is not None:
+                entry["status"] = status
+                entry["result"] = result
+                entry["done"].set()
+
+    def stop(self, timeout=2.0):
+        if not self.running:
+            return
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        if self._collector is not None:
+            self._collector.join(timeout)
+        self._ring.close()
+        self._ring.unlink()
+        self._ring = None
+        self._free_slots = queue.Queue()
+        self.ready_workers = 0
+
+    def status(self):
+        return {
+            "workers": self.workers,
+            "ready_workers": self.ready_workers,
+            "failure": self.failure,
+            "free_slots": self._free_slots.qsize(),
+            "in_flight": len(self._pending),
+        }
@@ -0,0 +1,124 @@
+"""
+Thread-safe log bus for WebSocket log streaming.
+
+Any thread can append() without blocking or needing an event loop. A drain
+task on the server loop collects pending entries into batches, keeps a ring
+of recent history for replay to newly connected clients, and feeds each
+client through its own bounded queue so one slow socket cannot hold up the
+others. Each WebSocket frame carries a JSON list of log entries.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+
+from metrics import WEBSOCKET_FANOUT_SECONDS
+
+
+class LogClient:
+    def __init__(self, websocket, max_batches):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=max_batches)
+        self.dropped_batches = 0
+        self.sender_task = None
+
+    def offer(self, batch_text):
+        """Queue a batch, dropping this client's oldest batch when it is behind"""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped_batches += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(batch_text)
+
+
+class LogBus:
+    def __init__(self, history_size=100, max_pending=2000, client_queue_batches=32, batch_interval=0.05, name="logs"):
+        self.name = name
+        self.history = deque(maxlen=history_size)
+        self._pending = deque(maxlen=max_pending)
+        self._sequence = itertools.count(1)
+        self.client_queue_batches = client_queue_batches
+        self.batch_interval = batch_interval
+        self.clients = []
+        self._loop = None
+        self._wake = None
+        self._wake_requested = False
+
+    def append(self, message, log_type="info"):
+        """Safe from any thread; never blocks"""
+        entry = {
+            "id": next(self._sequence),
+            "timestamp": time.strftime("%H:%M:%S"),
+            "message": message,
+            "type": log_type,
+        }
+        self._pending.append(entry)
+        loop = self._loop
+        if loop is not None and not self._wake_requested:
+            self._wake_requested = True
+            try:
+                loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass
+        return entry
+
+    async def register(self, websocket):
+        """Attach an accepted websocket, replaying recent history first"""
+        client = LogClient(websocket, self.client_queue_batches)
+        if self.history:
+            client.offer(json.dumps(list(self.history)))
+        client.sender_task = asyncio.create_task(self._send_loop(client))
+        self.clients.append(client)
+        return client
+
+    def unregister(self, websocket):
+        for client in list(self.clients):
+            if client.websocket is websocket:
+                self.clients.remove(client)
+                if client.sender_task is not None:
+                    client.sender_task.cancel()
+
+    async def run(self):
+        """Drain task; start once on the server event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while True:
+            if not self._pending:
+                await self._wake.wait()
+            self._wake.clear()
+            self._wake_requested = False
+            # Let a burst accumulate so it goes out as one frame per client
+            await asyncio.sleep(self.batch_interval)
+            self.flush()
+
+    def flush(self):
+        batch = []
+        while self._pending:
+            try:
+                batch.append(self._pending.popleft())
+            except IndexError:
+                break
+        if not batch:
+            return
+        self.history.extend(batch)
+        if not self.clients:
+            return
+        with WEBSOCKET_FANOUT_SECONDS.time(service=self.name, channel="logs"):
+            batch_text = json.dumps(batch)
+            for client in self.clients:
+                client.offer(batch_text)
+
+    async def _send_loop(self, client):
+        try:
+            while True:
+                batch_text = await client.queue.get()
+                await client.websocket.send_text(batch_text)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if client in self.clients:
+                self.clients.remove(client)
@@ -0,0 +1,177 @@
+"""
+Shared in-process instrumentation with Prometheus text exposition.
+
+Histograms are cumulative-bucket, thread-safe and labelled; every app
+exposes the process registry at GET /metrics via metrics_response().
+The common histograms below are shared by all services and told apart by
+the `service` label:
+
+    vision_stage_seconds{service, stage}    capture_wait, preprocess, inference,
+                                            track_predict, embedding, match,
+                                            postprocess, annotate, encode
+    pipeline_stage_seconds{service, stage}  FramePipeline thread busy time
+    frame_latency_seconds{service}          capture to encoded frame
+    tts_queue_wait_seconds{service, queue}  request queued -> speech started
+    db_query_seconds{service, query}
+    websocket_fanout_seconds{service, channel}
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.responses import Response
+
+from tracing import get_tracer
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# -------------------- METRIC TYPES --------------------
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _label_text(self.labelnames, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# -------------------- REGISTRY --------------------
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(name, lambda: Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "vision_stage_seconds", "Time spent in one processing step of a frame", ("service", "stage")
+)
+PIPELINE_STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_seconds", "Busy time of a FramePipeline stage thread per frame", ("service", "stage")
+)
+FRAME_LATENCY_SECONDS = REGISTRY.histogram(
+    "frame_latency_seconds", "Capture to encoded frame latency", ("service",)
+)
+TTS_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "tts_queue_wait_seconds", "Time a speech request waited before it started playing", ("service", "queue"),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "db_query_seconds", "Database query time", ("service", "query")
+)
+WEBSOCKET_FANOUT_SECONDS = REGISTRY.histogram(
+    "websocket_fanout_seconds", "Time to hand one message to every WebSocket client", ("service", "channel")
+)
+
+
+def observe_stage(service, stage, seconds):
+    """Record a stage that just finished; also a trace span when tracing is on"""
+    STAGE_SECONDS.observe(seconds, service=service, stage=stage)
+    finished = time.perf_counter()
+    get_tracer(service).record(stage, finished - seconds, finished)
+
+
+@contextmanager
+def stage_timer(service, stage):
+    """with stage_timer("object", "inference"): ..."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        finished = time.perf_counter()
+        STAGE_SECONDS.observe(finished - started, service=service, stage=stage)
+        get_tracer(service).record(stage, started, finished)
+
+
+@contextmanager
+def db_timer(service, query):
+    """with db_timer("face", "load_embeddings"): ... traced as db:<query>"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        finished = time.perf_counter()
+        DB_QUERY_SECONDS.observe(finished - started, service=service, query=query)
+        get_tracer(service).record(f"db:{query}", started, finished, category="db")
+
+
+def metrics_response(registry=REGISTRY):
+    return Response(registry.render(), media_type=CONTENT_TYPE)
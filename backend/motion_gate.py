@@ -0,0 +1,73 @@
+"""
+Cheap scene-change gate in front of the detector.
+
+Frames are reduced to a tiny grayscale thumbnail and compared with the
+thumbnail of the last frame that was actually inferred. Inference is only
+needed when the mean absolute difference passes the threshold, when enough
+blocks changed locally, or when the previous result is older than
+max_stale_seconds.
+"""
+
+import time
+
+import numpy as np
+import cv2
+
+
+class MotionGate:
+    def __init__(self, threshold=6.0, block_threshold=18.0, block_fraction=0.02,
+                 max_stale_seconds=1.0, thumbnail_size=(64, 36)):
+        self.threshold = threshold
+        self.block_threshold = block_threshold
+        self.block_fraction = block_fraction
+        self.max_stale_seconds = max_stale_seconds
+        self.thumbnail_size = thumbnail_size
+
+        self._reference = None
+        self._reference_time = 0.0
+        self.frames_seen = 0
+        self.frames_skipped = 0
+        self.last_change = 0.0
+
+    def _thumbnail(self, frame):
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(frame, self.thumbnail_size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def should_infer(self, frame):
+        """True when the detector has to run on this frame"""
+        self.frames_seen += 1
+        thumbnail = self._thumbnail(frame)
+        now = time.time()
+
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            changed = True
+        else:
+            difference = np.abs(thumbnail - self._reference)
+            self.last_change = float(difference.mean())
+            # A small object moving changes few pixels a lot; catch that as well as global change
+            local_change = np.count_nonzero(difference > self.block_threshold) / difference.size
+            changed = (
+                self.last_change > self.threshold or
+                local_change > self.block_fraction or
+                now - self._reference_time > self.max_stale_seconds
+            )
+
+        if changed:
+            self._reference = thumbnail
+            self._reference_time = now
+        else:
+            self.frames_skipped += 1
+        return changed
+
+    def force_next(self):
+        self._reference = None
+
+    @property
+    def hit_rate(self):
+        """Share of frames whose inference was skipped"""
+        return self.frames_skipped / self.frames_seen if self.frames_seen else 0.0
+
+    def reset_stats(self):
+        self.frames_seen = 0
+        self.frames_skipped = 0
@@ -10,26 +10,39 @@ warnings.filterwarnings('ignore')
 import threading
 import queue
 import time
-import math
 import sys
 import numpy as np
 import cv2
 from datetime import datetime
 import asyncio
-import json
 import hashlib
-from typing import List
 from concurrent.futures import ThreadPoolExecutor
 
+from suppression import suppress_overlaps, filter_box_sizes
+from pipeline import FramePipeline
+from broadcaster import FrameBroadcaster, MJPEG_MEDIA_TYPE
+from tracker import IoUTracker
+from depth import create_depth_provider
+from scene_geometry import SceneGeometry
+from scene_snapshot import SceneStore, IntentMatcher, SIDES
+from log_bus import LogBus
+from detection_channel import DetectionChannel
+from versioned import conditional_json, etag_json
+from metrics import observe_stage, stage_timer, metrics_response
+from tracing import get_tracer
+from motion_gate import MotionGate
+from adaptive import AdaptiveController, OBJECT_QUALITY_LEVELS
+
 # FastAPI imports
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 try:
-    from ultralytics import YOLO
+    from detector_backend import load_detector, detect_arrays
+    from inference_pool import InferencePool, PoolUnavailable
     import speech_recognition as sr
-    import pyttsx3
+    from speech import SpeechService, SpeechScheduler, PRIORITY_WARNING, PRIORITY_ANSWER, PRIORITY_INFO
 except ImportError as e:
     print(f"❌ Import Error: {e}")
     print("Please install required packages: pip install ultralytics speechrecognition pyttsx3 pyaudio")
@@ -41,6 +54,9 @@ LAPTOP_CAMERA_INDEX = 0
 FRAME_WIDTH = 1280
 FRAME_HEIGHT = 720
 DEPTH_PROCESSING_SKIP = 2
+DEPTH_BACKEND = "synthetic"  # "synthetic" or "onnx"
+DEPTH_MODEL_PATH = "depth_model.onnx"
+USE_DEPTH_SAMPLING = False  # Sample depth patches at box centres for scene objects
 DETECTION_CONFIDENCE = 0.5
 ANGLE_THRESHOLD = 25
 DEPTH_PATCH_SIZE = 7
@@ -48,6 +64,22 @@ CALIBRATION_TARGET_DISTANCE = 1.0
 INITIAL_DEPTH_SCALE = 2.5
 MINIMUM_ALERT_DISTANCE = 1.0
 USE_GRAYSCALE_MODE = False
+TRACKING_MODE = True
+DETECTION_INTERVAL = 3
+TRACK_MIN_CONFIDENCE = 0.35
+FIND_MODE_IMGSZ = 416
+FIND_MODE_TIMEOUT = 3.0
+USE_MOTION_GATE = True
+MOTION_GATE_THRESHOLD = 6.0
+MOTION_GATE_MAX_STALE = 1.0
+TARGET_FRAME_LATENCY_MS = 150
+DETECTOR_BACKEND = "torch"  # "torch", "onnx" or "openvino"
+DETECTOR_INT8 = False
+CALIBRATION_IMAGES_DIR = "calibration_images"
+INFERENCE_WORKERS = 0  # >0 runs YOLO in that many worker processes fed via shared memory
+ANNOTATE_FRAMES = True  # False streams raw frames; pages draw overlays from /ws/detections
+ANNOTATED_JPEG_QUALITY = 85
+RAW_JPEG_QUALITY = 70
 
 REAL_OBJECT_HEIGHTS = {
     "person": 1.7,
@@ -79,48 +111,34 @@ executor = ThreadPoolExecutor(max_workers=4)
 
 # -------------------- WEBSOCKET CONNECTION MANAGER --------------------
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
+    def __init__(self, bus: LogBus):
+        self.bus = bus
+    
+    @property
+    def active_connections(self):
+        return [client.websocket for client in self.bus.clients]
+    
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        await self.bus.register(websocket)
         await self.broadcast_log("🌐 English Vision Assistant connected", "success")
-
+    
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
+        self.bus.unregister(websocket)
+    
     async def broadcast_log(self, message: str, log_type: str = "info"):
-        if self.active_connections:
-            log_data = {
-                "timestamp": time.strftime("%H:%M:%S"),
-                "message": message,
-                "type": log_type
-            }
-            
-            disconnected = []
-            for connection in self.active_connections:
-                try:
-                    await connection.send_text(json.dumps(log_data))
-                except:
-                    disconnected.append(connection)
-            
-            for connection in disconnected:
-                self.active_connections.remove(connection)
+        self.bus.append(message, log_type)
 
-manager = ConnectionManager()
+log_bus = LogBus(name="object")
+manager = ConnectionManager(log_bus)
+detection_channel = DetectionChannel(name="object")
+tracer = get_tracer("object")
 
 # -------------------- LOGGING FUNCTIONS --------------------
 def log_to_terminal_and_web_sync(message: str, log_type: str = "info"):
-    """Synchronous logging for non-async contexts"""
+    """Logging from any thread; the log bus batches it out to WebSocket clients"""
     print(f"📱 {message}")
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            asyncio.create_task(manager.broadcast_log(message, log_type))
-    except RuntimeError:
-        pass
+    log_bus.append(message, log_type)
 
 # -------------------- CONVERSATION LOGGING --------------------
 def log_conversation(speaker: str, message: str, conv_type: str = "conversation"):
@@ -142,25 +160,34 @@ def log_conversation(speaker: str, message: str, conv_type: str = "conversation"
 
 # -------------------- GLOBAL VARIABLES - SINGLETON PATTERN --------------------
 command_queue = queue.Queue()
-latest_scene_data = []
-scene_data_lock = threading.Lock()
+scene_store = SceneStore()
 stop_program_event = threading.Event()
 current_depth_scale = INITIAL_DEPTH_SCALE
 is_depth_calibrated = False
 is_currently_speaking = threading.Event()
 microphone_is_active = threading.Event()
 last_warning_time_class = {}
+last_warning_time_track = {}
 WARNING_COOLDOWN = 5.0
 
 # SINGLETON SYSTEM VARIABLES
 system_initialized = False
 system_lock = threading.Lock()
 object_detector = None
+object_tracker = None
 depth_estimator = None
 video_capture = None
 frame_generator_active = False
+frame_pipeline = None
+active_find_request = None
+quality_controller = AdaptiveController(OBJECT_QUALITY_LEVELS, target_latency_ms=TARGET_FRAME_LATENCY_MS, name="object")
+quality_controller.on_change = lambda old, new, settings, latency: log_to_terminal_and_web_sync(
+    f"⚙️ Quality level {old} → {new} ({latency:.0f} ms): {settings}", "system"
+)
 
 # -------------------- FIXED TTS SYSTEM --------------------
+SPEECH_PRIORITIES = {"warning": PRIORITY_WARNING, "assistant": PRIORITY_ANSWER}
+
 class TTSManager:
     _instance = None
     _lock = threading.Lock()
@@ -175,150 +202,97 @@ class TTSManager:
     
     def __init__(self):
         if not self.initialized:
-            self.tts_queue = queue.Queue()
-            self.tts_thread = None
+            self.speech = SpeechService(rate=180, volume=1.0, name="object")
+            self.scheduler = SpeechScheduler(self._speak_blocking, self.speech.stop_speaking, name="object")
+            self.scheduler.on_start = self._on_start
             self.start_tts_worker()
             self.initialized = True
     
     def start_tts_worker(self):
-        """Start TTS worker thread that handles asyncio properly"""
-        def tts_worker():
-            while not stop_program_event.is_set():
-                try:
-                    # Get TTS request from queue
-                    tts_request = self.tts_queue.get(timeout=1)
-                    if tts_request is None:  # Shutdown signal
-                        break
-                    
-                    text, speaker, log_flag = tts_request
-                    
-                    # Log conversation BEFORE speaking
-                    if log_flag:
-                        log_conversation(speaker, text)
-                    
-                    # Create fresh TTS engine in this thread
-                    try:
-                        engine = pyttsx3.init()
-                        engine.setProperty('rate', 180)
-                        engine.setProperty('volume', 1.0)
-                        
-                        voices = engine.getProperty('voices')
-                        if voices and len(voices) > 0:
-                            engine.setProperty('voice', voices[0].id)
-                        
-                        # Set speaking flag
-                        is_currently_speaking.set()
-                        
-                        # Speak
-                        engine.say(text)
-                        engine.runAndWait()
-                        
-                        # Cleanup
-                        engine.stop()
-                        del engine
-                        
-                    except Exception as e:
-                        log_to_terminal_and_web_sync(f"❌ TTS Engine error: {e}", "error")
-                    finally:
-                        # Always clear speaking flag
-                        is_currently_speaking.clear()
-                        
-                except queue.Empty:
-                    continue
-                except Exception as e:
-                    log_to_terminal_and_web_sync(f"❌ TTS Worker error: {e}", "error")
-        
-        self.tts_thread = threading.Thread(target=tts_worker, daemon=True)
-        self.tts_thread.start()
+        """Start the priority scheduler's worker thread"""
+        self.scheduler.start()
         log_to_terminal_and_web_sync("✅ TTS Manager initialized", "system")
     
-    def speak(self, text, speaker="assistant", log_conversation_flag=True):
-        """Queue text for speaking"""
+    def _on_start(self, request):
+        # Log conversation BEFORE speaking
+        speaker, log_flag = request.payload
+        if log_flag:
+            log_conversation(speaker, request.text)
+    
+    def _speak_blocking(self, text):
+        # One persistent engine; recurring phrases play from the phrase cache
+        try:
+            is_currently_speaking.set()
+            self.speech.speak(text, wait=True)
+        except Exception as e:
+            log_to_terminal_and_web_sync(f"❌ TTS Engine error: {e}", "error")
+        finally:
+            # Always clear speaking flag
+            is_currently_speaking.clear()
+    
+    def speak(self, text, speaker="assistant", log_conversation_flag=True, key=None):
+        """Queue text for speaking; warnings jump the queue and interrupt answers"""
         try:
-            self.tts_queue.put((text, speaker, log_conversation_flag))
+            priority = SPEECH_PRIORITIES.get(speaker, PRIORITY_INFO)
+            self.scheduler.submit(text, priority, key=key, payload=(speaker, log_conversation_flag))
         except Exception as e:
             log_to_terminal_and_web_sync(f"❌ TTS Queue error: {e}", "error")
+    
+    def stop(self):
+        self.scheduler.stop()
+        self.speech.close()
 
-# Global TTS instance
-tts_manager = TTSManager()
+# Global TTS instance, created in the startup event so spawned inference workers
+# (which re-import this file) never start an engine of their own
+tts_manager = None
 
-def speak_text(text, speaker="assistant", log_conversation_flag=True):
+def speak_text(text, speaker="assistant", log_conversation_flag=True, key=None):
     """Main speak function using TTS manager"""
-    tts_manager.speak(text, speaker, log_conversation_flag)
-
-# -------------------- UTILITY FUNCTIONS --------------------
-def determine_side_from_angle(angle_degrees, threshold=ANGLE_THRESHOLD):
-    if angle_degrees < -threshold:
-        return "left"
-    elif angle_degrees > threshold:
-        return "right"
-    else:
-        return "center"
-
-def create_camera_intrinsics(image_width, image_height):
-    focal_length = 0.9 * image_width
-    return {
-        'fx': focal_length,
-        'fy': focal_length,
-        'cx': image_width / 2,
-        'cy': image_height / 2
-    }
-
-def convert_pixel_to_camera_coordinates(pixel_u, pixel_v, depth_z, camera_intrinsics):
-    x = (pixel_u - camera_intrinsics['cx']) * depth_z / camera_intrinsics['fx']
-    y = (pixel_v - camera_intrinsics['cy']) * depth_z / camera_intrinsics['fy']
-    z = depth_z
-    return np.array([x, y, z])
-
-def get_focal_length(frame_width, fov_deg=60):
-    return frame_width / (2 * math.tan(math.radians(fov_deg / 2)))
-
-def calculate_distance(bbox, obj_class, frame_height, frame_width):
-    x1, y1, x2, y2 = bbox
-    h_pixel = y2 - y1
-    w_pixel = x2 - x1
-    focal_length = get_focal_length(frame_width)
-    if obj_class in REAL_OBJECT_HEIGHTS and h_pixel > 0:
-        real_height = REAL_OBJECT_HEIGHTS[obj_class]
-        distance = (real_height * focal_length) / h_pixel
-    elif obj_class in REAL_OBJECT_WIDTHS and w_pixel > 0:
-        real_width = REAL_OBJECT_WIDTHS[obj_class]
-        distance = (real_width * focal_length) / w_pixel
-    else:
-        distance = 3.0
-    return round(max(0.2, min(12.0, distance)), 2)
-
-# -------------------- DEPTH MODEL --------------------
-class SimpleDepthModel:
-    def __init__(self):
-        self.previous_depth = None
-        
-    def estimate_depth(self, frame):
-        height, width = frame.shape[:2]
-        vertical_gradient = np.linspace(0, 1, height)[:, None]
-        horizontal_gradient = np.abs(np.linspace(-0.5, 0.5, width)[None, :])
-        noise = np.random.normal(0, 0.05, (height, width))
-        depth_map = np.clip(
-            0.1 + 0.7 * vertical_gradient + 0.1 * horizontal_gradient + noise,
-            0.05, 0.95
-        )
-        if self.previous_depth is not None:
-            depth_map = 0.7 * depth_map + 0.3 * self.previous_depth
-        self.previous_depth = depth_map.copy()
-        return depth_map
+    if tts_manager is not None:
+        tts_manager.speak(text, speaker, log_conversation_flag, key)
 
 # -------------------- OBJECT DETECTOR --------------------
 class ObjectDetector:
-    def __init__(self, model_name="yolov8n.pt"):
+    def __init__(self, model_name="yolov8n.pt", backend=DETECTOR_BACKEND):
+        self.model_name = model_name
+        self.backend = backend
+        self.inference_pool = None
         try:
-            self.yolo_model = YOLO(model_name)
+            self.yolo_model = load_detector(
+                model_name, backend, int8=DETECTOR_INT8, calibration_dir=CALIBRATION_IMAGES_DIR
+            )
             self.class_names = self.yolo_model.names
-            log_to_terminal_and_web_sync(f"✅ Loaded YOLO model: {model_name}", "system")
+            log_to_terminal_and_web_sync(f"✅ Loaded YOLO model: {model_name} ({backend})", "system")
         except Exception as e:
             log_to_terminal_and_web_sync(f"❌ Error loading YOLO model: {e}", "error")
             sys.exit(1)
+        
+    def start_workers(self):
+        """Worker processes start only once the camera works, so failed starts leak nothing"""
+        # Workers load after the parent so an exported backend is already cached on disk
+        if INFERENCE_WORKERS > 0 and self.inference_pool is None:
+            self.inference_pool = InferencePool(
+                load_detector, (self.model_name, self.backend, 640, DETECTOR_INT8, CALIBRATION_IMAGES_DIR),
+                detect_arrays, workers=INFERENCE_WORKERS, max_frame_shape=(FRAME_HEIGHT, FRAME_WIDTH, 3), name="object"
+            )
+            self.inference_pool.start()
+            log_to_terminal_and_web_sync(f"🧵 Started {INFERENCE_WORKERS} inference worker processes", "system")
+
+    def class_ids_matching(self, object_name):
+        """Class ids whose name contains object_name, e.g. 'phone' -> 'cell phone'"""
+        object_name = object_name.lower()
+        return [class_id for class_id, class_name in self.class_names.items() if object_name in class_name.lower()]
 
-    def detect_objects(self, frame):
+    def _raw_detect(self, frame, params):
+        """Worker pool when it can take the frame, otherwise in-process"""
+        if self.inference_pool is not None:
+            try:
+                return self.inference_pool.infer(frame, params)
+            except PoolUnavailable:
+                pass
+        return detect_arrays(self.yolo_model, frame, params)
+
+    def detect_objects(self, frame, classes=None, imgsz=640):
         global DETECTION_CONFIDENCE
         detected_objects = []
         confidence_levels = [
@@ -327,56 +301,47 @@ class ObjectDetector:
             min(0.9, DETECTION_CONFIDENCE + 0.1)
         ]
         
-        for confidence in confidence_levels:
-            try:
-                results = self.yolo_model(frame, imgsz=640, conf=confidence, verbose=False)
-                if results and results[0].boxes:
-                    for box in results[0].boxes:
-                        try:
-                            confidence_score = float(box.conf[0])
-                            class_id = int(box.cls[0])
-                            x1, y1, x2, y2 = map(int, box.xyxy[0].cpu().numpy())
-                            box_width = x2 - x1
-                            box_height = y2 - y1
-                            frame_height, frame_width = frame.shape[:2]
-                            
-                            if (box_width < 15 or box_height < 15 or
-                                box_width > frame_width * 0.85 or
-                                box_height > frame_height * 0.85):
-                                continue
-                                
-                            class_name = self.class_names.get(class_id, f"object_{class_id}")
-                            
-                            is_duplicate = False
-                            for existing_obj in detected_objects:
-                                ex1, ey1, ex2, ey2 = existing_obj['bbox']
-                                overlap_x = max(0, min(x2, ex2) - max(x1, ex1))
-                                overlap_y = max(0, min(y2, ey2) - max(y1, ey1))
-                                overlap_area = overlap_x * overlap_y
-                                current_area = box_width * box_height
-                                if overlap_area > current_area * 0.3:
-                                    if confidence_score > existing_obj['confidence']:
-                                        detected_objects = [obj for obj in detected_objects if obj != existing_obj]
-                                    else:
-                                        is_duplicate = True
-                                    break
-                                    
-                            if not is_duplicate:
-                                detected_objects.append({
-                                    'class': class_name,
-                                    'confidence': confidence_score,
-                                    'bbox': [x1, y1, x2, y2]
-                                })
-                        except Exception as e:
-                            continue
-            except Exception as e:
-                continue
-                
-            if len(detected_objects) >= 12:
-                break
-                
-        detected_objects.sort(key=lambda x: -x['confidence'])
-        return detected_objects[:12]
+        # Run YOLO once at the loosest tier; score-ordered suppression below replaces the tier passes
+        try:
+            all_bboxes, all_scores, all_class_ids = self._raw_detect(
+                frame, {"imgsz": imgsz, "conf": min(confidence_levels), "classes": classes}
+            )
+        except Exception as e:
+            return detected_objects
+        
+        if not len(all_scores):
+            return detected_objects
+        
+        all_bboxes = all_bboxes.astype(int)
+        frame_height, frame_width = frame.shape[:2]
+        
+        valid = filter_box_sizes(
+            all_bboxes, min_width=15, min_height=15,
+            max_width=frame_width * 0.85, max_height=frame_height * 0.85
+        )
+        candidate_indices = np.flatnonzero(valid)
+        
+        # Greedy best-score-first suppression; a box is a duplicate when >30% of it is covered
+        keep = suppress_overlaps(
+            all_bboxes[candidate_indices], all_scores[candidate_indices],
+            containment_threshold=0.3, max_detections=12
+        )
+        
+        for index in candidate_indices[keep]:
+            class_id = int(all_class_ids[index])
+            detected_objects.append({
+                'class': self.class_names.get(class_id, f"object_{class_id}"),
+                'class_id': class_id,
+                'confidence': float(all_scores[index]),
+                'bbox': [int(v) for v in all_bboxes[index]]
+            })
+        
+        return detected_objects
+
+    def close(self):
+        if self.inference_pool is not None:
+            self.inference_pool.stop()
+            self.inference_pool = None
 
 # -------------------- VOICE RECOGNITION --------------------
 def voice_recognition_thread():
@@ -426,42 +391,38 @@ def voice_recognition_thread():
         microphone_is_active.clear()
 
 # -------------------- VOICE COMMAND PROCESSING - FIXED --------------------
+VOICE_INTENTS = [
+    ("find", ['is there', 'do you see', 'any', 'can you find']),
+    ("describe", ['screen', 'see', 'describe', 'everything', 'what']),
+    ("side", ['left', 'right', 'center', 'front', 'middle']),
+    ("distance", ['how far', 'distance', 'far is']),
+    ("count", ['how many', 'count', 'total']),
+    ("closest", ['closest', 'nearest']),
+    ("help", ['help', 'commands', 'what can']),
+]
+FIND_TARGETS = ['person', 'chair', 'table', 'bottle', 'car', 'laptop', 'phone', 'book', 'cup', 'dog', 'cat', 'tv', 'monitor', 'keyboard', 'mouse']
+FIND_TARGETS_WITHOUT_CLASS = ['monitor']  # No COCO class of their own; matched as substrings like before
+intent_matcher = IntentMatcher(VOICE_INTENTS, FIND_TARGETS, substring_targets=FIND_TARGETS_WITHOUT_CLASS)
+
 def process_voice_command(command_text):
-    global latest_scene_data
-    
-    with scene_data_lock:
-        current_scene = latest_scene_data.copy()
+    current_scene = scene_store.current
     
     log_to_terminal_and_web_sync(f"🤖 Processing command: {command_text}", "command")
     
-    def format_object_list(objects):
-        if not objects:
-            return "nothing"
-        object_counts = {}
-        for obj in objects:
-            class_name = obj['class']
-            object_counts[class_name] = object_counts.get(class_name, 0) + 1
-        formatted_items = []
-        for class_name, count in object_counts.items():
-            if count > 1:
-                formatted_items.append(f"{count} {class_name}s")
-            else:
-                formatted_items.append(class_name)
-        return ", ".join(formatted_items)
+    intent, argument = intent_matcher.match(command_text)
     
     # Check for specific object queries
-    if any(keyword in command_text for keyword in ['is there', 'do you see', 'any', 'can you find']):
-        object_to_find = None
-        words = command_text.split()
-        
-        common_objects = ['person', 'chair', 'table', 'bottle', 'car', 'laptop', 'phone', 'book', 'cup', 'dog', 'cat', 'tv', 'monitor', 'keyboard', 'mouse']
-        for obj_name in common_objects:
-            if obj_name in command_text:
-                object_to_find = obj_name
-                break
+    if intent == "find":
+        object_to_find = argument
         
         if object_to_find:
-            found_objects = [obj for obj in current_scene if object_to_find in obj['class'].lower()]
+            found_objects = current_scene.find(object_to_find)
+            if not found_objects:
+                # Not in the last full scene: search the next frames for just this class
+                find_request = start_find_mode(object_to_find)
+                if find_request is not None:
+                    find_request.done.wait(FIND_MODE_TIMEOUT + 1.0)
+                    found_objects = find_request.found_objects
             if found_objects:
                 count = len(found_objects)
                 if count == 1:
@@ -476,65 +437,57 @@ def process_voice_command(command_text):
         return
     
     # Process other command types
-    if any(keyword in command_text for keyword in ['screen', 'see', 'describe', 'everything', 'what']):
+    if intent == "describe":
         if not current_scene:
             speak_text("The screen appears to be empty", "assistant", True)
             return
         
         log_to_terminal_and_web_sync(f"📊 Found {len(current_scene)} objects on screen", "detection")
         
-        object_list = format_object_list(current_scene)
-        speak_text(f"I can see {len(current_scene)} objects on screen: {object_list}", "assistant", True)
+        speak_text(f"I can see {len(current_scene)} objects on screen: {current_scene.summary}", "assistant", True)
         
         time.sleep(1)
         
-        for side in ['left', 'center', 'right']:
-            side_objects = [obj for obj in current_scene if obj['side'] == side]
-            if side_objects:
-                speak_text(f"On the {side}: {format_object_list(side_objects)}", "assistant", True)
+        for side in SIDES:
+            if current_scene.by_side[side]:
+                speak_text(f"On the {side}: {current_scene.side_summaries[side]}", "assistant", True)
                 time.sleep(0.5)
         
-        if current_scene:
-            closest_object = min(current_scene, key=lambda x: x['distance_meters'])
-            speak_text(f"The closest object is {closest_object['class']} at {closest_object['distance_meters']:.1f} meters", "assistant", True)
+        closest_object = current_scene.nearest
+        speak_text(f"The closest object is {closest_object['class']} at {closest_object['distance_meters']:.1f} meters", "assistant", True)
     
-    elif any(keyword in command_text for keyword in ['left', 'right', 'center', 'front', 'middle']):
-        target_side = None
-        for side in ['left', 'right', 'center']:
-            if side in command_text:
-                target_side = side
-                break
+    elif intent == "side":
+        target_side = argument
         
         if target_side:
-            side_objects = [obj for obj in current_scene if obj['side'] == target_side]
-            if side_objects:
-                speak_text(f"On the {target_side} side I see: {format_object_list(side_objects)}", "assistant", True)
+            if current_scene.by_side[target_side]:
+                speak_text(f"On the {target_side} side I see: {current_scene.side_summaries[target_side]}", "assistant", True)
             else:
                 speak_text(f"I don't see any objects on the {target_side} side", "assistant", True)
     
-    elif any(keyword in command_text for keyword in ['how far', 'distance', 'far is']):
+    elif intent == "distance":
         if current_scene:
-            closest_object = min(current_scene, key=lambda x: x['distance_meters'])
+            closest_object = current_scene.nearest
             speak_text(f"The closest object is {closest_object['class']} at {closest_object['distance_meters']:.1f} meters away", "assistant", True)
         else:
             speak_text("I don't see any objects to measure distance to", "assistant", True)
     
-    elif any(keyword in command_text for keyword in ['how many', 'count', 'total']):
+    elif intent == "count":
         if current_scene:
             speak_text(f"I can see a total of {len(current_scene)} objects", "assistant", True)
             time.sleep(0.5)
-            speak_text(f"They are: {format_object_list(current_scene)}", "assistant", True)
+            speak_text(f"They are: {current_scene.summary}", "assistant", True)
         else:
             speak_text("I don't see any objects to count", "assistant", True)
     
-    elif any(keyword in command_text for keyword in ['closest', 'nearest']):
+    elif intent == "closest":
         if current_scene:
-            closest_object = min(current_scene, key=lambda x: x['distance_meters'])
+            closest_object = current_scene.nearest
             speak_text(f"The closest object is {closest_object['class']} at {closest_object['distance_meters']:.1f} meters", "assistant", True)
         else:
             speak_text("I don't see any objects on screen", "assistant", True)
     
-    elif any(keyword in command_text for keyword in ['help', 'commands', 'what can']):
+    elif intent == "help":
         log_to_terminal_and_web_sync("ℹ️ Help command requested", "info")
         speak_text("I can help you with these commands: what's on screen, what's on the left or right, how far is something, how many objects, what's the closest object, or ask if there's any specific object like chair or person", "assistant", True)
     
@@ -544,7 +497,7 @@ def process_voice_command(command_text):
 
 # -------------------- SINGLETON SYSTEM INITIALIZATION --------------------
 def initialize_system():
-    global system_initialized, object_detector, depth_estimator, video_capture
+    global system_initialized, object_detector, object_tracker, depth_estimator, video_capture
     
     with system_lock:
         if system_initialized:
@@ -553,9 +506,11 @@ def initialize_system():
         
         log_to_terminal_and_web_sync("🚀 Initializing English Vision Voice Assistant", "system")
         
-        # Initialize object detector
-        object_detector = ObjectDetector()
-        depth_estimator = SimpleDepthModel()
+        # Initialize object detector (kept across retries; its workers start after the camera check)
+        if object_detector is None:
+            object_detector = ObjectDetector()
+        object_tracker = IoUTracker(detection_interval=DETECTION_INTERVAL, min_confidence=TRACK_MIN_CONFIDENCE)
+        depth_estimator = create_depth_provider(DEPTH_BACKEND, DEPTH_MODEL_PATH)
         
         # Initialize camera
         log_to_terminal_and_web_sync("📹 Connecting to camera...", "system")
@@ -567,6 +522,7 @@ def initialize_system():
         
         if not video_capture.isOpened():
             log_to_terminal_and_web_sync("❌ No camera available!", "error")
+            object_detector.close()
             return False
         
         video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
@@ -577,9 +533,11 @@ def initialize_system():
         if not ret or test_frame is None:
             log_to_terminal_and_web_sync("❌ Camera read test failed", "error")
             video_capture.release()
+            object_detector.close()
             return False
         
         log_to_terminal_and_web_sync("✅ Camera initialized successfully", "success")
+        object_detector.start_workers()
         
         # Start voice recognition thread - ONLY ONCE
         voice_thread = threading.Thread(target=voice_recognition_thread, daemon=True)
@@ -590,166 +548,359 @@ def initialize_system():
         return True
 
 # -------------------- MAIN VIDEO PROCESSING --------------------
-def generate_frames():
-    global latest_scene_data, video_capture, object_detector, depth_estimator
-    global USE_GRAYSCALE_MODE, DETECTION_CONFIDENCE, last_warning_time_class, frame_generator_active
+def tracks_to_detections(tracks, frame_width, frame_height):
+    """Tracker output in the same dict format detect_objects returns"""
+    track_ids, boxes, scores, class_ids = tracks
+    boxes = np.clip(boxes, 0, [frame_width - 1, frame_height - 1, frame_width - 1, frame_height - 1]).astype(int)
+    detections = []
+    for track_id, box, score, class_id in zip(track_ids, boxes, scores, class_ids):
+        x1, y1, x2, y2 = (int(v) for v in box)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        detections.append({
+            'class': object_detector.class_names.get(int(class_id), f"object_{class_id}"),
+            'class_id': int(class_id),
+            'confidence': float(score),
+            'bbox': [x1, y1, x2, y2],
+            'track_id': int(track_id)
+        })
+    return detections
+
+def read_camera_frame():
+    """Capture stage: newest frame from the camera or None"""
+    with stage_timer("object", "capture_wait"):
+        ret, frame = video_capture.read()
+    if not ret or frame is None:
+        return None
+    return frame
+
+def build_scene_objects(detected_objects, frame_state, frame_width, frame_height):
+    """Distances, angles and sides for every detection in one batched call"""
+    geometry = frame_state['scene_geometry']
+    if not geometry.matches(frame_width, frame_height):
+        geometry = frame_state['scene_geometry'] = SceneGeometry(
+            frame_width, frame_height, REAL_OBJECT_HEIGHTS, REAL_OBJECT_WIDTHS, ANGLE_THRESHOLD
+        )
+    distances, angles, sides = geometry.compute(
+        [d['bbox'] for d in detected_objects], [d['class'] for d in detected_objects]
+    )
     
-    # Prevent multiple frame generators
-    if frame_generator_active:
-        log_to_terminal_and_web_sync("⚠️ Frame generator already active, returning existing stream", "warning")
-        return
+    scene_objects = [
+        {
+            'class': detection['class'],
+            'confidence': detection['confidence'],
+            'bbox': detection['bbox'],
+            'distance_meters': distance,
+            'angle_degrees': angle,
+            'side': side,
+            'track_id': detection.get('track_id')
+        }
+        for detection, distance, angle, side in zip(detected_objects, distances.tolist(), angles.tolist(), sides.tolist())
+    ]
+    if USE_DEPTH_SAMPLING:
+        for i, obj in enumerate(scene_objects):
+            depth_key = obj['track_id'] if obj['track_id'] is not None else i
+            obj['relative_depth'] = frame_state['last_patch_depths'].get(depth_key)
+    return scene_objects, distances
+
+def issue_close_object_warnings(scene_objects, distances, current_time):
+    """Warn only for objects inside the alert distance, cooldown per tracked object"""
+    for index in np.flatnonzero(distances < MINIMUM_ALERT_DISTANCE):
+        obj = scene_objects[index]
+        objclass = obj['class']
+        track_id = obj['track_id']
+        warning_times = last_warning_time_track if track_id is not None else last_warning_time_class
+        warning_key = track_id if track_id is not None else objclass
+        if (warning_key not in warning_times or
+            current_time - warning_times[warning_key] > WARNING_COOLDOWN):
+            
+            warning_message = f"{objclass} is very close at {obj['distance_meters']:.1f} meters!"
+            # Keyed per object so a newer distance replaces one still waiting to be spoken
+            speak_text(warning_message, "warning", True, key=("warning", warning_key))
+            
+            warning_times[warning_key] = current_time
     
-    frame_generator_active = True
+    # Forget cooldowns of tracks that are long gone
+    if len(last_warning_time_track) > 64:
+        for stale_key in [k for k, t in last_warning_time_track.items() if current_time - t > WARNING_COOLDOWN]:
+            del last_warning_time_track[stale_key]
+
+def dispatch_voice_commands():
+    """Hand up to two queued voice commands to worker threads"""
+    commands_processed = 0
+    while not command_queue.empty() and commands_processed < 2:
+        try:
+            voice_command = command_queue.get_nowait()
+            command_thread = threading.Thread(target=process_voice_command, args=(voice_command,), daemon=True)
+            command_thread.start()
+            commands_processed += 1
+        except queue.Empty:
+            break
+
+class FindRequest:
+    """Targeted search for one object name, answered by the inference stage"""
     
-    if not initialize_system():
-        log_to_terminal_and_web_sync("❌ System initialization failed", "error")
-        frame_generator_active = False
-        return
+    def __init__(self, target, class_ids, timeout):
+        self.target = target
+        self.class_ids = class_ids
+        self.deadline = time.time() + timeout
+        self.found_objects = []
+        self.done = threading.Event()
+
+def start_find_mode(target):
+    """Switch the inference stage to a class-filtered search; None if not possible"""
+    global active_find_request
     
-    frame_counter = 0
-    fps_counter = 0
-    last_depth_map = None
-    fps_timer = time.time()
+    if not frame_generator_active or object_detector is None:
+        return None
+    class_ids = object_detector.class_ids_matching(target)
+    if not class_ids:
+        return None
     
-    ret, test_frame = video_capture.read()
-    if not ret:
-        frame_generator_active = False
-        return
+    find_request = FindRequest(target, class_ids, FIND_MODE_TIMEOUT)
+    active_find_request = find_request
+    log_to_terminal_and_web_sync(f"🔍 Find mode: searching for {target}", "command")
+    return find_request
+
+def run_find_mode(processing_frame, find_request, frame_state, frame_width, frame_height):
+    """Inference stage while a find request is active: only the target classes, smaller input"""
+    global active_find_request
+    
+    detected_objects = object_detector.detect_objects(
+        processing_frame, classes=find_request.class_ids, imgsz=FIND_MODE_IMGSZ
+    )
+    with frame_state['lock']:
+        scene_objects, distances = build_scene_objects(detected_objects, frame_state, frame_width, frame_height)
+        issue_close_object_warnings(scene_objects, distances, time.time())
+    
+    if scene_objects or time.time() > find_request.deadline:
+        find_request.found_objects = scene_objects
+        active_find_request = None
+        find_request.done.set()
+    
+    return scene_objects
+
+def run_scene_inference(current_frame, frame_state):
+    """
+    Inference stage: detection, depth, scene geometry and warnings.
+    With worker processes several frames are in here at once; the shared
+    state is touched under frame_state['lock'] and only the detector call
+    runs outside it.
+    """
+    frame_height, frame_width = current_frame.shape[:2]
+    
+    if USE_GRAYSCALE_MODE:
+        with stage_timer("object", "preprocess"):
+            processing_frame = cv2.cvtColor(current_frame, cv2.COLOR_BGR2GRAY)
+            processing_frame = cv2.cvtColor(processing_frame, cv2.COLOR_GRAY2BGR)
+    else:
+        processing_frame = current_frame
+    
+    dispatch_voice_commands()
+    
+    # A pending voice query narrows this frame to the requested classes only
+    find_request = active_find_request
+    if find_request is not None:
+        return run_find_mode(processing_frame, find_request, frame_state, frame_width, frame_height)
+    
+    with frame_state['lock']:
+        frame_state['frame_counter'] += 1
+        frame_index = frame_state['frame_counter']
+        
+        # Frames skipped by the latency controller, or nearly identical to the last one, reuse the previous result
+        quality = quality_controller.settings
+        if (not quality_controller.should_process(frame_index) or
+            (USE_MOTION_GATE and not frame_state['motion_gate'].should_infer(processing_frame))):
+            scene_objects = frame_state['last_scene_objects']
+            issue_close_object_warnings(scene_objects, frame_state['last_distances'], time.time())
+            return scene_objects
         
-    frame_height, frame_width = test_frame.shape[:2]
-    camera_intrinsics = create_camera_intrinsics(frame_width, frame_height)
+        # Tracker carry-forward between detector calls
+        run_detector = not TRACKING_MODE or object_tracker.needs_detection()
+        if not run_detector:
+            with stage_timer("object", "track_predict"):
+                detected_objects = tracks_to_detections(object_tracker.predict(processing_frame), frame_width, frame_height)
     
-    log_to_terminal_and_web_sync(f"📐 Frame size: {frame_width}x{frame_height}", "system")
+    if run_detector:
+        with stage_timer("object", "inference"):
+            detected_objects = object_detector.detect_objects(processing_frame, imgsz=quality['imgsz'])
+    
+    with frame_state['lock']:
+        postprocess_started = time.perf_counter()
+        # A newer frame already finished; never move the tracker or the scene backwards
+        if frame_index < frame_state['last_applied_index']:
+            return frame_state['last_scene_objects']
+        frame_state['last_applied_index'] = frame_index
+        
+        if run_detector and TRACKING_MODE:
+            track_ids = object_tracker.update(
+                [d['bbox'] for d in detected_objects],
+                [d['confidence'] for d in detected_objects],
+                [d['class_id'] for d in detected_objects],
+                processing_frame
+            )
+            for detection, track_id in zip(detected_objects, track_ids):
+                detection['track_id'] = int(track_id)
+        
+        # Depth is only sampled at the box centres, and only when something consumes it
+        if (USE_DEPTH_SAMPLING and quality['depth'] and detected_objects and
+            frame_index % DEPTH_PROCESSING_SKIP == 0):
+            box_centres = [((d['bbox'][0] + d['bbox'][2]) // 2, (d['bbox'][1] + d['bbox'][3]) // 2) for d in detected_objects]
+            patch_depths = depth_estimator.depth_at(current_frame, box_centres, DEPTH_PATCH_SIZE)
+            frame_state['last_patch_depths'] = {
+                (d['track_id'] if d.get('track_id') is not None else i): float(depth)
+                for i, (d, depth) in enumerate(zip(detected_objects, patch_depths))
+            }
+        
+        current_time = time.time()
+        
+        scene_objects, distances = build_scene_objects(detected_objects, frame_state, frame_width, frame_height)
+        
+        issue_close_object_warnings(scene_objects, distances, current_time)
+        frame_state['last_scene_objects'] = scene_objects
+        frame_state['last_distances'] = distances
+        
+        # Publish an immutable snapshot for voice commands and /scene_data
+        scene_store.publish(scene_objects)
+    
+    observe_stage("object", "postprocess", time.perf_counter() - postprocess_started)
+    return scene_objects
+
+def annotate_and_encode_frame(current_frame, scene_objects, frame_state):
+    """Encode stage: draw boxes and overlays (optional), then JPEG-encode"""
+    # FPS monitoring
+    frame_state['fps_counter'] += 1
+    if frame_state['fps_counter'] % 120 == 0:
+        current_fps = 120 / (time.time() - frame_state['fps_timer'])
+        stage_fps = frame_state['pipeline'].stage_fps()
+        stage_summary = " | ".join(f"{stage} {stats['fps']:.1f}" for stage, stats in stage_fps.items())
+        motion_gate = frame_state['motion_gate']
+        gate_summary = f" | Gate skip: {100 * motion_gate.hit_rate:.0f}%" if USE_MOTION_GATE else ""
+        motion_gate.reset_stats()
+        log_to_terminal_and_web_sync(f"📊 FPS: {current_fps:.1f} | Objects: {len(scene_objects)} | Stages: {stage_summary}{gate_summary}", "system")
+        frame_state['fps_timer'] = time.time()
+    
+    # Only result-only clients connected: nothing to draw or encode
+    if frame_broadcaster.video_subscriber_count == 0:
+        return None
+    
+    if not ANNOTATE_FRAMES:
+        with stage_timer("object", "encode"):
+            ret, buffer = cv2.imencode('.jpg', current_frame, [cv2.IMWRITE_JPEG_QUALITY, RAW_JPEG_QUALITY])
+        return buffer.tobytes() if ret else None
+    
+    annotate_started = time.perf_counter()
+    display_frame = current_frame.copy()
+    
+    # Draw bounding boxes and labels
+    for i, obj in enumerate(scene_objects):
+        x1, y1, x2, y2 = obj['bbox']
+        
+        if obj['side'] == 'left':
+            box_color = (255, 100, 100)
+        elif obj['side'] == 'right':
+            box_color = (100, 255, 100)
+        else:
+            box_color = (100, 100, 255)
+        
+        brightness = int(155 + 100 * obj['confidence'])
+        box_color = tuple(min(255, int(color * brightness / 255)) for color in box_color)
+        thickness = 3 if obj['confidence'] > 0.5 else 2
+        
+        cv2.rectangle(display_frame, (x1, y1), (x2, y2), box_color, thickness)
+        
+        label_text = f"{obj['class']} {obj['distance_meters']:.1f}m"
+        if obj['distance_meters'] < MINIMUM_ALERT_DISTANCE:
+            label_text += " ⚠️"
+        
+        (text_width, text_height), _ = cv2.getTextSize(label_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+        cv2.rectangle(display_frame, (x1, y1 - text_height - 8), (x1 + text_width + 5, y1), box_color, -1)
+        cv2.putText(display_frame, label_text, (x1 + 2, y1 - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+        cv2.putText(display_frame, str(i + 1), (x1 + 5, y1 + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.8, box_color, 2)
+    
+    # Add status overlay
+    tts_status = "🔊 SPEAKING" if is_currently_speaking.is_set() else "🎤 LISTENING"
+    cv2.putText(display_frame, f"English Assistant {tts_status}", (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    
+    # Object counts by side
+    left_count = len([obj for obj in scene_objects if obj['side'] == 'left'])
+    center_count = len([obj for obj in scene_objects if obj['side'] == 'center'])
+    right_count = len([obj for obj in scene_objects if obj['side'] == 'right'])
+    cv2.putText(display_frame, f"Left: {left_count} | Center: {center_count} | Right: {right_count}", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+    
+    observe_stage("object", "annotate", time.perf_counter() - annotate_started)
+    
+    # Encode frame for streaming
+    with stage_timer("object", "encode"):
+        ret, buffer = cv2.imencode('.jpg', display_frame, [cv2.IMWRITE_JPEG_QUALITY, ANNOTATED_JPEG_QUALITY])
+    if not ret:
+        return None
+    return buffer.tobytes()
+
+def run_object_pipeline(stop_event, publish):
+    """Broadcaster producer: one capture/inference/encode pipeline shared by all viewers"""
+    global frame_generator_active, frame_pipeline
+    
+    frame_generator_active = True
     
     try:
-        while not stop_program_event.is_set():
-            ret, current_frame = video_capture.read()
-            frame_counter += 1
-            
-            if not ret or current_frame is None:
-                continue
-                
-            display_frame = current_frame.copy()
-            
-            if USE_GRAYSCALE_MODE:
-                processing_frame = cv2.cvtColor(current_frame, cv2.COLOR_BGR2GRAY)
-                processing_frame = cv2.cvtColor(processing_frame, cv2.COLOR_GRAY2BGR)
-            else:
-                processing_frame = current_frame
-            
-            # Object detection
-            detected_objects = object_detector.detect_objects(processing_frame)
-            
-            if frame_counter % DEPTH_PROCESSING_SKIP == 0:
-                last_depth_map = depth_estimator.estimate_depth(current_frame)
-            
-            scene_objects = []
-            current_time = time.time()
-            
-            # Process each detected object
-            for detection in detected_objects:
-                x1, y1, x2, y2 = detection['bbox']
-                center_u = (x1 + x2) // 2
-                center_v = (y1 + y2) // 2
-                
-                # Calculate distance
-                actual_distance = calculate_distance(detection['bbox'], detection['class'], frame_height, frame_width)
-                
-                # Calculate position
-                camera_x, camera_y, camera_z = convert_pixel_to_camera_coordinates(center_u, center_v, actual_distance, camera_intrinsics)
-                angle_degrees = math.degrees(math.atan2(camera_x, camera_z))
-                side_position = determine_side_from_angle(angle_degrees)
-                
-                scene_objects.append({
-                    'class': detection['class'],
-                    'confidence': detection['confidence'],
-                    'bbox': detection['bbox'],
-                    'distance_meters': actual_distance,
-                    'angle_degrees': round(angle_degrees, 1),
-                    'side': side_position
-                })
-                
-                # Warning system
-                objclass = detection['class']
-                if actual_distance < MINIMUM_ALERT_DISTANCE:
-                    if (objclass not in last_warning_time_class or
-                        current_time - last_warning_time_class[objclass] > WARNING_COOLDOWN):
-                        
-                        warning_message = f"{objclass} is very close at {actual_distance:.1f} meters!"
-                        speak_text(warning_message, "warning", True)
-                        
-                        last_warning_time_class[objclass] = current_time
-            
-            # Update global scene data
-            with scene_data_lock:
-                latest_scene_data = scene_objects.copy()
-            
-            # Draw bounding boxes and labels
-            for i, obj in enumerate(scene_objects):
-                x1, y1, x2, y2 = obj['bbox']
-                
-                if obj['side'] == 'left':
-                    box_color = (255, 100, 100)
-                elif obj['side'] == 'right':
-                    box_color = (100, 255, 100)
-                else:
-                    box_color = (100, 100, 255)
-                
-                brightness = int(155 + 100 * obj['confidence'])
-                box_color = tuple(min(255, int(color * brightness / 255)) for color in box_color)
-                thickness = 3 if obj['confidence'] > 0.5 else 2
-                
-                cv2.rectangle(display_frame, (x1, y1), (x2, y2), box_color, thickness)
-                
-                label_text = f"{obj['class']} {obj['distance_meters']:.1f}m"
-                if obj['distance_meters'] < MINIMUM_ALERT_DISTANCE:
-                    label_text += " ⚠️"
-                
-                (text_width, text_height), _ = cv2.getTextSize(label_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
-                cv2.rectangle(display_frame, (x1, y1 - text_height - 8), (x1 + text_width + 5, y1), box_color, -1)
-                cv2.putText(display_frame, label_text, (x1 + 2, y1 - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
-                cv2.putText(display_frame, str(i + 1), (x1 + 5, y1 + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.8, box_color, 2)
-            
-            # Add status overlay
-            tts_status = "🔊 SPEAKING" if is_currently_speaking.is_set() else "🎤 LISTENING"
-            cv2.putText(display_frame, f"English Assistant {tts_status}", (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            
-            # Object counts by side
-            left_count = len([obj for obj in scene_objects if obj['side'] == 'left'])
-            center_count = len([obj for obj in scene_objects if obj['side'] == 'center'])
-            right_count = len([obj for obj in scene_objects if obj['side'] == 'right'])
-            cv2.putText(display_frame, f"Left: {left_count} | Center: {center_count} | Right: {right_count}", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-            
-            # FPS monitoring
-            fps_counter += 1
-            if fps_counter % 120 == 0:
-                current_fps = 120 / (time.time() - fps_timer)
-                log_to_terminal_and_web_sync(f"📊 FPS: {current_fps:.1f} | Objects: {len(scene_objects)}", "system")
-                fps_timer = time.time()
-            
-            # Process voice commands
-            commands_processed = 0
-            while not command_queue.empty() and commands_processed < 2:
-                try:
-                    voice_command = command_queue.get_nowait()
-                    command_thread = threading.Thread(target=process_voice_command, args=(voice_command,), daemon=True)
-                    command_thread.start()
-                    commands_processed += 1
-                except queue.Empty:
-                    break
+        if not initialize_system():
+            log_to_terminal_and_web_sync("❌ System initialization failed", "error")
+            return
+        
+        ret, test_frame = video_capture.read()
+        if not ret:
+            return
             
-            # Encode frame for streaming
-            ret, buffer = cv2.imencode('.jpg', display_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if ret:
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        frame_height, frame_width = test_frame.shape[:2]
+        log_to_terminal_and_web_sync(f"📐 Frame size: {frame_width}x{frame_height}", "system")
+        
+        frame_state = {
+            'lock': threading.Lock(),
+            'frame_counter': 0,
+            'last_applied_index': 0,
+            'fps_counter': 0,
+            'fps_timer': time.time(),
+            'last_patch_depths': {},
+            'motion_gate': MotionGate(threshold=MOTION_GATE_THRESHOLD, max_stale_seconds=MOTION_GATE_MAX_STALE),
+            'last_scene_objects': [],
+            'last_distances': np.empty(0),
+            'scene_geometry': SceneGeometry(frame_width, frame_height, REAL_OBJECT_HEIGHTS, REAL_OBJECT_WIDTHS, ANGLE_THRESHOLD),
+        }
+        
+        frame_pipeline = FramePipeline(
+            read_camera_frame,
+            lambda frame: run_scene_inference(frame, frame_state),
+            lambda frame, scene_objects: annotate_and_encode_frame(frame, scene_objects, frame_state),
+            name="object",
+            inference_threads=max(1, INFERENCE_WORKERS)
+        )
+        frame_pipeline.on_error = lambda stage, e: log_to_terminal_and_web_sync(f"❌ Frame {stage} error: {e}", "error")
+        frame_pipeline.on_output = lambda sequence, frame_bytes: publish(frame_bytes)
+        frame_pipeline.on_latency = quality_controller.record
+        frame_pipeline.on_result = lambda sequence, frame, scene_objects: detection_channel.publish(
+            sequence, (frame.shape[1], frame.shape[0]), scene_objects
+        )
+        frame_state['pipeline'] = frame_pipeline
+        frame_pipeline.start()
+        
+        while not stop_event.is_set() and not stop_program_event.is_set():
+            stop_event.wait(0.5)
+        
+        frame_pipeline.stop()
     
     except Exception as e:
         log_to_terminal_and_web_sync(f"❌ Frame generation error: {e}", "error")
     finally:
         frame_generator_active = False
 
+frame_broadcaster = FrameBroadcaster(run_object_pipeline, name="object")
+frame_broadcaster.on_error = lambda e: log_to_terminal_and_web_sync(f"❌ Broadcaster error: {e}", "error")
+
+def generate_frames():
+    """Per-client MJPEG stream; every client shares the one broadcaster pipeline"""
+    return frame_broadcaster.stream()
+
 # -------------------- WEBSOCKET ENDPOINT --------------------
 @app.websocket("/ws/logs")
 async def websocket_logs(websocket: WebSocket):
@@ -758,14 +909,32 @@ async def websocket_logs(websocket: WebSocket):
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
+@app.websocket("/ws/detections")
+async def websocket_detections(websocket: WebSocket, every_frame: bool = False):
+    """Detections only, for pages that draw their own overlay; every_frame=false sends changes only"""
+    await websocket.accept()
+    # Keeps the camera pipeline running without receiving any video
+    subscriber = frame_broadcaster.subscribe(video=False)
+    await detection_channel.register(websocket, every_frame)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        detection_channel.unregister(websocket)
+        frame_broadcaster.unsubscribe(subscriber)
+
 # -------------------- REST ENDPOINTS --------------------
 @app.get("/video_feed")
 async def video_feed():
     return StreamingResponse(
         generate_frames(),
-        media_type="multipart/x-mixed-replace; boundary=frame"
+        media_type=MJPEG_MEDIA_TYPE
     )
 
 @app.get("/")
@@ -773,37 +942,93 @@ async def root():
     return {"message": "🎥 English Vision Voice Assistant API"}
 
 @app.get("/status")
-async def get_status():
-    return {
+async def get_status(request: Request):
+    """
+    System state; If-None-Match with the last ETag returns 304 while nothing
+    changed. Per-frame statistics live at /status/live so they do not change
+    the ETag on every poll.
+    """
+    return etag_json(request, {
         "mode": "ENGLISH_VISION_ASSISTANT",
-        "objects_detected": len(latest_scene_data),
+        "objects_detected": len(scene_store.current),
         "microphone_active": microphone_is_active.is_set(),
         "is_speaking": is_currently_speaking.is_set(),
         "confidence_threshold": DETECTION_CONFIDENCE,
+        "detector_backend": DETECTOR_BACKEND,
+        "tracking_mode": TRACKING_MODE,
+        "find_target": active_find_request.target if active_find_request else None,
+        "depth_backend": depth_estimator.name if depth_estimator else DEPTH_BACKEND,
+        "depth_sampling": USE_DEPTH_SAMPLING,
+        "active_tracks": len(object_tracker) if object_tracker else 0,
         "active_connections": len(manager.active_connections),
         "system_initialized": system_initialized,
         "frame_generator_active": frame_generator_active,
+        "video_clients": frame_broadcaster.video_subscriber_count,
+        "detection_clients": detection_channel.client_count,
+        "annotate_frames": ANNOTATE_FRAMES,
+        "quality_level": quality_controller.level,
+    })
+
+@app.get("/status/live")
+async def get_live_status():
+    """Counters and timings that change every frame; never cached"""
+    return {
+        "speech": {**tts_manager.scheduler.status(), "engine": tts_manager.speech.status()} if tts_manager else None,
+        "quality": quality_controller.status(),
+        "pipeline_stages": frame_pipeline.stage_fps() if frame_pipeline and frame_pipeline.running else {},
+        "inference_pool": object_detector.inference_pool.status() if object_detector and object_detector.inference_pool else None,
+        "tracing": tracer.status(),
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of the stage histograms"""
+    return metrics_response()
+
+@app.get("/trace")
+async def get_trace():
+    """Chrome / Perfetto trace-event JSON for the most recent traced frames"""
+    return tracer.export()
+
+@app.post("/trace/start")
+async def start_trace():
+    tracer.start()
+    return tracer.status()
+
+@app.post("/trace/stop")
+async def stop_trace():
+    tracer.stop()
+    return tracer.status()
+
 @app.get("/scene_data")
-async def get_scene_data():
-    """Get current scene objects data"""
-    with scene_data_lock:
-        return {
-            "objects": latest_scene_data.copy(),
-            "total_count": len(latest_scene_data),
-            "timestamp": time.strftime("%H:%M:%S")
-        }
+async def get_scene_data(request: Request, since: int = None, wait: float = 0.0):
+    """
+    Get current scene objects data. Send the last ETag as If-None-Match (or
+    ?since=<version>) to get 304 while the scene is unchanged; add
+    ?wait=<seconds> to long-poll until it changes.
+    """
+    return await conditional_json(
+        request, scene_store.notifier, lambda: scene_store.current.payload, "scene", since, wait
+    )
+
+# -------------------- STARTUP / CLEANUP --------------------
+@app.on_event("startup")
+async def startup_event():
+    global tts_manager
+    tts_manager = TTSManager()
+    asyncio.create_task(log_bus.run())
 
-# -------------------- CLEANUP ON SHUTDOWN --------------------
 @app.on_event("shutdown")
 async def shutdown_event():
     stop_program_event.set()
+    frame_broadcaster.stop()
+    if object_detector is not None:
+        object_detector.close()
     if video_capture:
         video_capture.release()
-    # Stop TTS queue
-    if tts_manager.tts_queue:
-        tts_manager.tts_queue.put(None)  # Shutdown signal
+    # Stop TTS scheduler
+    if tts_manager is not None:
+        tts_manager.stop()
     log_to_terminal_and_web_sync("🛑 English Vision Assistant shutting down", "system")
 
 if __name__ == "__main__":
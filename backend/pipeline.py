@@ -0,0 +1,244 @@
+"""
+Three-stage capture -> inference -> annotate/encode pipeline.
+
+Each stage runs in its own thread and hands work to the next one through a
+single-slot buffer that only ever holds the newest item, so a slow stage
+drops stale frames instead of queueing them and throughput is set by the
+slowest stage rather than the sum of all three.
+"""
+
+import threading
+import time
+
+from metrics import PIPELINE_STAGE_SECONDS, FRAME_LATENCY_SECONDS
+from tracing import get_tracer
+
+
+# -------------------- SINGLE-SLOT BUFFER --------------------
+class LatestSlot:
+    """Bounded one-item buffer; put() overwrites whatever has not been taken yet"""
+
+    def __init__(self):
+        self._item = None
+        self._has_item = False
+        self._condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        with self._condition:
+            if self._has_item:
+                self.dropped += 1
+            self._item = item
+            self._has_item = True
+            self._condition.notify_all()
+
+    def get(self, timeout=None):
+        """Take the newest item, or return None after timeout"""
+        with self._condition:
+            if not self._has_item:
+                self._condition.wait(timeout)
+            if not self._has_item:
+                return None
+            item = self._item
+            self._item = None
+            self._has_item = False
+            return item
+
+    def clear(self):
+        with self._condition:
+            self._item = None
+            self._has_item = False
+
+
+# -------------------- STAGE STATISTICS --------------------
+class StageStats:
+    """Rolling per-stage frame rate and busy time"""
+
+    def __init__(self, name, window_seconds=2.0):
+        self.name = name
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._window_frames = 0
+        self._window_busy = 0.0
+        self.fps = 0.0
+        self.busy_ms = 0.0
+        self.total_frames = 0
+
+    def record(self, busy_seconds):
+        with self._lock:
+            self._window_frames += 1
+            self._window_busy += busy_seconds
+            self.total_frames += 1
+            elapsed = time.time() - self._window_start
+            if elapsed >= self.window_seconds:
+                self.fps = self._window_frames / elapsed
+                self.busy_ms = 1000.0 * self._window_busy / self._window_frames
+                self._window_start = time.time()
+                self._window_frames = 0
+                self._window_busy = 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return {"fps": round(self.fps, 1), "busy_ms": round(self.busy_ms, 1), "frames": self.total_frames}
+
+
+# -------------------- PIPELINE ENGINE --------------------
+class FramePipeline:
+    """
+    capture_fn() -> frame or None
+    infer_fn(frame) -> result
+    encode_fn(frame, result) -> bytes or None
+
+    Frames travel with a monotonically increasing sequence number and their
+    capture time. Encoded output is either pulled with get_output() or pushed
+    to on_output; on_latency(seconds) receives the capture-to-encoded latency.
+    on_result(sequence, frame, result) sees every inference result in order,
+    before encoding, for consumers that only need the results.
+
+    inference_threads > 1 runs several infer_fn calls at once (for detectors
+    served by worker processes); results that finish out of order are
+    dropped so the output never goes back in time.
+    """
+
+    STAGES = ("capture", "inference", "encode")
+
+    def __init__(self, capture_fn, infer_fn, encode_fn, name="pipeline", inference_threads=1):
+        self.capture_fn = capture_fn
+        self.infer_fn = infer_fn
+        self.encode_fn = encode_fn
+        self.name = name
+        self.inference_threads = max(1, inference_threads)
+
+        self.capture_slot = LatestSlot()
+        self.inference_slot = LatestSlot()
+        self.output_slot = LatestSlot()
+        self.stats = {stage: StageStats(stage) for stage in self.STAGES}
+
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._sequence = 0
+        self._last_encoded_sequence = 0
+        self.on_error = None
+        self.on_output = None
+        self.on_latency = None
+        self.on_result = None
+        self.tracer = get_tracer(name)
+
+    @property
+    def running(self):
+        return bool(self._threads) and not self._stop_event.is_set()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._last_encoded_sequence = 0
+        self._threads = [threading.Thread(target=self._capture_loop, name=f"{self.name}-capture", daemon=True)]
+        self._threads.extend(
+            threading.Thread(target=self._inference_loop, name=f"{self.name}-inference-{index}", daemon=True)
+            for index in range(self.inference_threads)
+        )
+        self._threads.append(threading.Thread(target=self._encode_loop, name=f"{self.name}-encode", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+        for slot in (self.capture_slot, self.inference_slot, self.output_slot):
+            slot.clear()
+
+    def get_output(self, timeout=1.0):
+        """Newest (sequence, encoded_bytes) pair, or None"""
+        return self.output_slot.get(timeout)
+
+    def stage_fps(self):
+        return {stage: stats.snapshot() for stage, stats in self.stats.items()}
+
+    def _record(self, stage, busy_seconds):
+        self.stats[stage].record(busy_seconds)
+        PIPELINE_STAGE_SECONDS.observe(busy_seconds, service=self.name, stage=stage)
+        finished = time.perf_counter()
+        self.tracer.record(f"pipeline:{stage}", finished - busy_seconds, finished, category="pipeline")
+
+    def _report_error(self, stage, error):
+        if self.on_error is not None:
+            try:
+                self.on_error(stage, error)
+            except Exception:
+                pass
+
+    def _capture_loop(self):
+        while not self._stop_event.is_set():
+            started = time.perf_counter()
+            self.tracer.set_frame(self._sequence + 1)
+            try:
+                frame = self.capture_fn()
+            except Exception as e:
+                self._report_error("capture", e)
+                time.sleep(0.1)
+                continue
+            if frame is None:
+                time.sleep(0.005)
+                continue
+            self._sequence += 1
+            self.capture_slot.put((self._sequence, frame, time.perf_counter()))
+            self._record("capture", time.perf_counter() - started)
+
+    def _inference_loop(self):
+        while not self._stop_event.is_set():
+            item = self.capture_slot.get(timeout=0.5)
+            if item is None:
+                continue
+            sequence, frame, captured_at = item
+            self.tracer.set_frame(sequence)
+            started = time.perf_counter()
+            try:
+                result = self.infer_fn(frame)
+            except Exception as e:
+                self._report_error("inference", e)
+                continue
+            self.inference_slot.put((sequence, frame, captured_at, result))
+            self._record("inference", time.perf_counter() - started)
+
+    def _encode_loop(self):
+        while not self._stop_event.is_set():
+            item = self.inference_slot.get(timeout=0.5)
+            if item is None:
+                continue
+            sequence, frame, captured_at, result = item
+            if sequence < self._last_encoded_sequence:
+                continue
+            self._last_encoded_sequence = sequence
+            self.tracer.set_frame(sequence)
+            if self.on_result is not None:
+                try:
+                    self.on_result(sequence, frame, result)
+                except Exception as e:
+                    self._report_error("result", e)
+            started = time.perf_counter()
+            try:
+                encoded = self.encode_fn(frame, result)
+            except Exception as e:
+                self._report_error("encode", e)
+                continue
+            if encoded is not None:
+                if self.on_output is not None:
+                    try:
+                        self.on_output(sequence, encoded)
+                    except Exception as e:
+                        self._report_error("output", e)
+                else:
+                    self.output_slot.put((sequence, encoded))
+            finished = time.perf_counter()
+            self._record("encode", finished - started)
+            FRAME_LATENCY_SECONDS.observe(finished - captured_at, service=self.name)
+            if self.on_latency is not None:
+                try:
+                    self.on_latency(finished - captured_at)
+                except Exception as e:
+                    self._report_error("latency", e)
@@ -0,0 +1,79 @@
+"""
+Batched scene geometry for detections.
+
+Camera intrinsics and the FOV focal length are computed once per frame size;
+compute() then turns a whole (N, 4) box array into distances, bearing angles
+and left/center/right sides in a single vectorized call.
+"""
+
+import math
+
+import numpy as np
+
+
+SIDE_NAMES = np.array(["left", "center", "right"])
+
+
+class SceneGeometry:
+    def __init__(self, frame_width, frame_height, real_heights, real_widths,
+                 angle_threshold=25, fov_deg=60, default_distance=3.0,
+                 min_distance=0.2, max_distance=12.0):
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.angle_threshold = angle_threshold
+        self.default_distance = default_distance
+        self.min_distance = min_distance
+        self.max_distance = max_distance
+
+        # Intrinsics used for the bearing, FOV focal length used for size-based distance
+        self.fx = 0.9 * frame_width
+        self.cx = frame_width / 2
+        self.cy = frame_height / 2
+        self.focal_length = frame_width / (2 * math.tan(math.radians(fov_deg / 2)))
+
+        self._real_heights = dict(real_heights)
+        self._real_widths = dict(real_widths)
+        self._class_sizes = {}
+
+    def matches(self, frame_width, frame_height):
+        return self.frame_width == frame_width and self.frame_height == frame_height
+
+    def _sizes_for(self, class_names):
+        """Known real (height, width) per class, NaN where unknown; cached per class name"""
+        sizes = np.empty((len(class_names), 2), dtype=np.float64)
+        for i, class_name in enumerate(class_names):
+            size = self._class_sizes.get(class_name)
+            if size is None:
+                size = (self._real_heights.get(class_name, np.nan), self._real_widths.get(class_name, np.nan))
+                self._class_sizes[class_name] = size
+            sizes[i] = size
+        return sizes
+
+    def compute(self, bboxes, class_names):
+        """Returns (distances, angles, sides) arrays, one row per box"""
+        bboxes = np.asarray(bboxes, dtype=np.int64).reshape(-1, 4)
+        if len(bboxes) == 0:
+            return np.empty(0), np.empty(0), np.empty(0, dtype=SIDE_NAMES.dtype)
+
+        pixel_heights = (bboxes[:, 3] - bboxes[:, 1]).astype(np.float64)
+        pixel_widths = (bboxes[:, 2] - bboxes[:, 0]).astype(np.float64)
+        sizes = self._sizes_for(class_names)
+        real_heights, real_widths = sizes[:, 0], sizes[:, 1]
+
+        use_height = ~np.isnan(real_heights) & (pixel_heights > 0)
+        use_width = ~use_height & ~np.isnan(real_widths) & (pixel_widths > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            distances = np.where(
+                use_height, real_heights * self.focal_length / pixel_heights,
+                np.where(use_width, real_widths * self.focal_length / pixel_widths, self.default_distance)
+            )
+        distances = np.round(np.clip(distances, self.min_distance, self.max_distance), 2)
+
+        centre_u = (bboxes[:, 0] + bboxes[:, 2]) // 2
+        camera_x = (centre_u - self.cx) * distances / self.fx
+        angles = np.degrees(np.arctan2(camera_x, distances))
+
+        side_index = np.ones(len(bboxes), dtype=np.int64)
+        side_index[angles < -self.angle_threshold] = 0
+        side_index[angles > self.angle_threshold] = 2
+        return distances, np.round(angles, 1), SIDE_NAMES[side_index]
@@ -0,0 +1,175 @@
+"""
+Immutable, versioned scene snapshots and the voice-command intent matcher.
+
+The frame loop publishes one SceneSnapshot per processed frame. Readers
+(voice commands, /scene_data) grab the current reference and use its
+precomputed indexes directly: no lock, no copy, no rescans.
+"""
+
+import re
+import threading
+import time
+
+from versioned import ChangeNotifier
+
+
+SIDES = ("left", "center", "right")
+
+
+def format_object_list(objects):
+    if not objects:
+        return "nothing"
+    object_counts = {}
+    for obj in objects:
+        class_name = obj['class']
+        object_counts[class_name] = object_counts.get(class_name, 0) + 1
+    formatted_items = []
+    for class_name, count in object_counts.items():
+        if count > 1:
+            formatted_items.append(f"{count} {class_name}s")
+        else:
+            formatted_items.append(class_name)
+    return ", ".join(formatted_items)
+
+
+# -------------------- SNAPSHOT --------------------
+class SceneSnapshot:
+    """
+    Read-only view of one frame's scene. The object dicts are shared with
+    every reader and must not be mutated after publication.
+    """
+
+    __slots__ = ("version", "timestamp", "objects", "by_side", "by_class",
+                 "nearest", "summary", "side_summaries", "payload")
+
+    def __init__(self, version, objects, timestamp=None):
+        self.version = version
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.objects = tuple(objects)
+
+        by_side = {side: [] for side in SIDES}
+        by_class = {}
+        for obj in self.objects:
+            by_side.setdefault(obj['side'], []).append(obj)
+            by_class.setdefault(obj['class'], []).append(obj)
+        self.by_side = {side: tuple(objs) for side, objs in by_side.items()}
+        self.by_class = {class_name: tuple(objs) for class_name, objs in by_class.items()}
+
+        self.nearest = min(self.objects, key=lambda x: x['distance_meters']) if self.objects else None
+        self.summary = format_object_list(self.objects)
+        self.side_summaries = {side: format_object_list(objs) for side, objs in self.by_side.items()}
+
+        # Response body for /scene_data, built once per frame instead of once per poll
+        self.payload = {
+            "objects": list(self.objects),
+            "total_count": len(self.objects),
+            "timestamp": time.strftime("%H:%M:%S", time.localtime(self.timestamp)),
+            "version": self.version,
+        }
+
+    def __len__(self):
+        return len(self.objects)
+
+    def find(self, object_name):
+        """Objects whose class name contains object_name, e.g. 'phone' -> 'cell phone'"""
+        object_name = object_name.lower()
+        found = []
+        for class_name, objs in self.by_class.items():
+            if object_name in class_name.lower():
+                found.extend(objs)
+        return found
+
+
+def scene_signature(objects, box_quantum=8, distance_step=0.1, with_tracks=True):
+    """
+    Coarse identity of a scene: classes, sides and boxes on a box_quantum
+    pixel grid, plus track ids unless with_tracks is False and distances in
+    distance_step units unless it is None.
+    """
+    return tuple(
+        (obj['class'], obj.get('side'),
+         obj.get('track_id') if with_tracks else None,
+         round(obj['distance_meters'] / distance_step) if distance_step else None,
+         tuple(int(v) // box_quantum for v in obj['bbox']))
+        for obj in objects
+    )
+
+
+class SceneStore:
+    """
+    Holds the current snapshot; publish() swaps the reference atomically.
+    A new version is only cut when the scene visibly changed, so pollers
+    and long-poll waiters on `notifier` are not woken by per-frame jitter.
+    """
+
+    def __init__(self):
+        self._version_lock = threading.Lock()
+        self._signature = ()
+        self.notifier = ChangeNotifier()
+        self.current = SceneSnapshot(0, ())
+
+    @property
+    def version(self):
+        return self.current.version
+
+    def publish(self, objects):
+        signature = scene_signature(objects)
+        with self._version_lock:
+            if signature == self._signature:
+                return self.current
+            self._signature = signature
+            snapshot = SceneSnapshot(self.current.version + 1, objects)
+            self.current = snapshot
+        self.notifier.bump()
+        return snapshot
+
+
+# -------------------- INTENT MATCHING --------------------
+def _alternatives(keywords):
+    return "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+
+
+def _keyword_pattern(keywords):
+    return re.compile(rf"\b(?:{_alternatives(keywords)})\b")
+
+
+def _plural_pattern(keywords):
+    """Whole words with an optional plural ending; group(1) is the keyword itself"""
+    return re.compile(rf"\b({_alternatives(keywords)})(?:s|es)?\b")
+
+
+class IntentMatcher:
+    """
+    Resolves a recognised phrase to (intent, argument) with precompiled
+    word-boundary patterns, checked in priority order. Find targets also
+    match their plurals ("chairs" -> "chair"); substring_targets are found
+    anywhere in the phrase, for names the detector has no class of its own for.
+    """
+
+    def __init__(self, intents, find_targets, sides=("left", "right", "center"), substring_targets=()):
+        self._intents = [(name, _keyword_pattern(keywords)) for name, keywords in intents]
+        self._find_target_pattern = _plural_pattern(find_targets)
+        self._substring_targets = sorted(substring_targets, key=len, reverse=True)
+        self._side_pattern = _keyword_pattern(sides)
+
+    def _find_target(self, command_text):
+        target = self._find_target_pattern.search(command_text)
+        if target:
+            return target.group(1)
+        for candidate in self._substring_targets:
+            if candidate in command_text:
+                return candidate
+        return None
+
+    def match(self, command_text):
+        for name, pattern in self._intents:
+            if not pattern.search(command_text):
+                continue
+            argument = None
+            if name == "find":
+                argument = self._find_target(command_text)
+            elif name == "side":
+                side = self._side_pattern.search(command_text)
+                argument = side.group(0) if side else None
+            return name, argument
+        return "unknown", None
@@ -0,0 +1,499 @@
+"""
+Speech output shared by the assistants.
+
+SpeechService owns one long-lived pyttsx3 engine on its own thread and
+plays phrases that keep recurring from an on-disk WAV cache rendered with
+save_to_file, so templated messages do not pay engine setup and synthesis
+every time.
+
+SpeechScheduler adds priority-aware scheduling on top.
+
+Requests carry a message class: warnings beat answers, answers beat
+informational chatter. Each class has a time-to-live so nothing is spoken
+after it stopped being true, identical queued text is coalesced, and a
+request with the same key replaces the queued one it supersedes (e.g. a
+newer distance for the same object). A new warning interrupts lower
+priority speech, and the number of queued warnings is capped, so the
+delay before a safety alert is bounded by at most max_queued_warnings
+other warnings, however deep the queue is.
+"""
+
+import hashlib
+import heapq
+import itertools
+import os
+import queue
+import threading
+import time
+import wave
+from collections import OrderedDict
+
+import pyttsx3
+
+from metrics import TTS_QUEUE_WAIT_SECONDS
+
+try:
+    import winsound
+except ImportError:
+    winsound = None
+
+
+PRIORITY_WARNING = 0
+PRIORITY_ANSWER = 1
+PRIORITY_INFO = 2
+PRIORITY_NAMES = {PRIORITY_WARNING: "warning", PRIORITY_ANSWER: "answer", PRIORITY_INFO: "info"}
+# Answers are counted from submit and a multi-sentence reply is queued all at once,
+# so their TTL has to cover the sentences spoken ahead of the last one
+DEFAULT_TTL = {PRIORITY_WARNING: 3.0, PRIORITY_ANSWER: 30.0, PRIORITY_INFO: 6.0}
+DEFAULT_PHRASE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrase_cache")
+
+
+# -------------------- PHRASE CACHE --------------------
+class PhraseCache:
+    """Pre-synthesized WAV files keyed by text, voice, rate and volume, evicted least recently used"""
+
+    def __init__(self, cache_dir=DEFAULT_PHRASE_CACHE_DIR, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Rebuild the LRU order from file times so the cache survives restarts
+        existing = [entry for entry in os.scandir(cache_dir) if entry.name.endswith(".wav")]
+        for entry in sorted(existing, key=lambda e: e.stat().st_mtime):
+            self._entries[entry.name[:-4]] = entry.stat().st_size
+            self.total_bytes += entry.stat().st_size
+        self._evict()
+
+    @staticmethod
+    def key(text, voice, rate, volume=1.0):
+        return hashlib.sha1(f"{voice}|{rate}|{volume}|{text}".encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def lookup(self, key):
+        """Cached file path or None; a hit refreshes the entry's LRU position"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.total_bytes -= self._entries.pop(key, 0)
+            return None
+        return path
+
+    def add(self, key):
+        """Register a freshly rendered file"""
+        path = self.path(key)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        with self._lock:
+            self.total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = os.path.getsize(path)
+            self.total_bytes += self._entries[key]
+            self._evict()
+        return path
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def status(self):
+        return {"entries": len(self._entries), "bytes": self.total_bytes, "hits": self.hits, "misses": self.misses}
+
+
+# -------------------- SPEECH SERVICE --------------------
+class SpeechService:
+    """
+    One persistent engine serving speak() calls from any thread. A phrase is
+    rendered to the cache once it has been asked for cache_after_uses times
+    and from then on is played back from disk. Cached playback uses
+    winsound, so on other platforms every phrase goes through the engine.
+    A render cut short by stop_speaking() is discarded, never cached.
+    stop_speaking() only records which requests to cut; the engine thread
+    stops the engine itself, between words or before starting a request.
+    If the engine cannot be created, speak() returns False straight away.
+    """
+
+    def __init__(self, rate=180, volume=1.0, voice_index=0, cache_dir=DEFAULT_PHRASE_CACHE_DIR,
+                 cache_entries=256, cache_after_uses=2, name="speech"):
+        self.rate = rate
+        self.volume = volume
+        self.voice_index = voice_index
+        self.cache_after_uses = cache_after_uses
+        self.name = name
+        self.cache = PhraseCache(cache_dir, max_entries=cache_entries) if cache_dir and winsound is not None else None
+
+        self._requests = queue.Queue()
+        self._use_counts = {}
+        self._engine = None
+        self._voice_id = "default"
+        self._engine_failed = False
+        # Requests are numbered as they are queued; an interrupt cuts every request up to
+        # the last one queued when it arrived, even those the engine thread has not taken yet
+        self._sequence_lock = threading.Lock()
+        self._queued_through = 0
+        self._interrupted_through = 0
+        self._current_sequence = 0
+        self._interrupt_wake = threading.Event()
+        self.busy = False
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-tts", daemon=True)
+        self._thread.start()
+
+    def speak(self, text, wait=False, timeout=30.0):
+        """Queue text; with wait=True block until it has been spoken. False when there is no engine"""
+        if self._engine_failed:
+            return False
+        done = threading.Event()
+        with self._sequence_lock:
+            self._queued_through += 1
+            self._requests.put((self._queued_through, text, done, time.perf_counter()))
+        if self._engine_failed:
+            # The engine thread gave up between the check above and the put
+            self._release_requests()
+            return False
+        if wait:
+            return done.wait(timeout) and not self._engine_failed
+        return True
+
+    @property
+    def available(self):
+        return not self._engine_failed
+
+    @property
+    def idle(self):
+        return not self.busy and self._requests.empty()
+
+    def stop_speaking(self):
+        """Interrupt the current utterance (or phrase render) and anything queued so far; safe from any thread"""
+        with self._sequence_lock:
+            self._interrupted_through = self._queued_through
+        self._interrupt_wake.set()
+
+    def _interrupted(self, sequence):
+        return sequence <= self._interrupted_through
+
+    def _on_word(self, name, location, length):
+        # Runs on the engine thread inside runAndWait, the only place engine.stop() is safe
+        if self._interrupted(self._current_sequence):
+            self._engine.stop()
+
+    def close(self, timeout=2.0):
+        self._stop_event.set()
+        self._requests.put(None)
+        self.stop_speaking()
+        self._thread.join(timeout)
+
+    def _init_engine(self):
+        engine = pyttsx3.init()
+        engine.setProperty('rate', self.rate)
+        engine.setProperty('volume', self.volume)
+        voices = engine.getProperty('voices')
+        if voices and len(voices) > self.voice_index:
+            engine.setProperty('voice', voices[self.voice_index].id)
+            self._voice_id = voices[self.voice_index].id
+        engine.connect('started-word', self._on_word)
+        return engine
+
+    def _run(self):
+        # pyttsx3 engines are bound to the thread that created them
+        try:
+            self._engine = self._init_engine()
+        except Exception as e:
+            print(f"❌ {self.name} TTS engine error: {e}")
+            self._engine_failed = True
+            self._release_requests()
+            return
+        while not self._stop_event.is_set():
+            request = self._requests.get()
+            if request is None:
+                break
+            sequence, text, done, queued_at = request
+            TTS_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued_at, service=self.name, queue="engine")
+            self._current_sequence = sequence
+            # Clear before checking, so an interrupt arriving in between still wakes playback
+            self._interrupt_wake.clear()
+            if self._interrupted(sequence):
+                done.set()
+                continue
+            self.busy = True
+            try:
+                self._say(sequence, text)
+            except Exception as e:
+                print(f"⚠️ {self.name} TTS error: {e}")
+            finally:
+                self.busy = False
+                done.set()
+        self._engine.stop()
+
+    def _release_requests(self):
+        """Wake every waiter of a request that will never be spoken"""
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None:
+                request[2].set()
+
+    def _say(self, sequence, text):
+        cached_path = self._cached_phrase(sequence, text)
+        if self._interrupted(sequence):
+            return
+        if cached_path is None:
+            self._engine.say(text)
+            self._engine.runAndWait()
+            return
+        self._play_file(sequence, cached_path)
+
+    def _play_file(self, sequence, path):
+        """Asynchronous playback so an interrupt can cut it off with PlaySound(None, 0)"""
+        with wave.open(path, "rb") as wav:
+            duration = wav.getnframes() / float(wav.getframerate() or 1)
+        winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC | winsound.SND_NODEFAULT)
+        if self._interrupt_wake.wait(duration + 0.05) and self._interrupted(sequence):
+            winsound.PlaySound(None, 0)
+
+    def _cached_phrase(self, sequence, text):
+        """WAV path for text, rendering it first once the phrase has proved to recur"""
+        if self.cache is None:
+            return None
+        key = PhraseCache.key(text, self._voice_id, self.rate, self.volume)
+        path = self.cache.lookup(key)
+        if path is not None:
+            return path
+        uses = self._use_counts.get(key, 0) + 1
+        if uses < self.cache_after_uses:
+            if len(self._use_counts) > 4 * self.cache.max_entries:
+                self._use_counts.clear()
+            self._use_counts[key] = uses
+            return None
+        self._use_counts.pop(key, None)
+        path = self.cache.path(key)
+        self._engine.save_to_file(text, path)
+        self._engine.runAndWait()
+        if self._interrupted(sequence):
+            # engine.stop() truncated the render; a partial WAV must never be cached
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return self.cache.add(key)
+
+    def status(self):
+        return {
+            "busy": self.busy,
+            "engine_failed": self._engine_failed,
+            "queued": self._requests.qsize(),
+            "cache": self.cache.status() if self.cache is not None else None,
+        }
+
+
+class SpeechRequest:
+    __slots__ = ("text", "priority", "key", "payload", "created", "expires", "sequence", "cancelled")
+
+    def __init__(self, text, priority, key, payload, ttl, sequence):
+        self.text = text
+        self.priority = priority
+        self.key = key
+        self.payload = payload
+        self.created = time.time()
+        self.expires = self.created + ttl
+        self.sequence = sequence
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class SpeechScheduler:
+    """
+    speak_fn(text) blocks while speaking; interrupt_fn() cuts the current
+    utterance short. on_start(request) runs right before a request is
+    spoken, on_drop(request, reason) whenever one is discarded.
+    """
+
+    def __init__(self, speak_fn, interrupt_fn=None, ttl=None, max_queued_warnings=2, name="speech"):
+        self.speak_fn = speak_fn
+        self.interrupt_fn = interrupt_fn
+        self.ttl = {**DEFAULT_TTL, **(ttl or {})}
+        self.max_queued_warnings = max_queued_warnings
+        self.name = name
+
+        self._heap = []
+        self._by_key = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count(1)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.current = None
+        self._interrupted = None
+        self.on_start = None
+        self.on_drop = None
+        self.counters = {"spoken": 0, "expired": 0, "duplicate": 0, "superseded": 0, "interrupted": 0, "overflow": 0}
+
+    # -------------------- PRODUCER SIDE --------------------
+    def submit(self, text, priority=PRIORITY_INFO, key=None, payload=None):
+        """Queue text; returns False when it was coalesced into an existing request"""
+        dropped = []
+        interrupt = False
+        with self._condition:
+            current = self.current
+            if current is not None and current.text == text:
+                self.counters["duplicate"] += 1
+                return False
+            for queued in self._live_requests():
+                if queued.text == text:
+                    self.counters["duplicate"] += 1
+                    return False
+
+            if key is not None and key in self._by_key:
+                superseded = self._by_key.pop(key)
+                superseded.cancelled = True
+                self.counters["superseded"] += 1
+                dropped.append((superseded, "superseded"))
+
+            request = SpeechRequest(text, priority, key, payload, self.ttl[priority], next(self._sequence))
+            heapq.heappush(self._heap, request)
+            if key is not None:
+                self._by_key[key] = request
+
+            if priority == PRIORITY_WARNING:
+                warnings_queued = sorted(r for r in self._live_requests() if r.priority == PRIORITY_WARNING)
+                for oldest in warnings_queued[:max(0, len(warnings_queued) - self.max_queued_warnings)]:
+                    self._cancel(oldest)
+                    self.counters["overflow"] += 1
+                    dropped.append((oldest, "overflow"))
+                interrupt = (current is not None and current.priority > PRIORITY_WARNING and
+                             self._interrupted is not current)
+                if interrupt:
+                    self._interrupted = current
+
+            self._condition.notify()
+
+        for request, reason in dropped:
+            self._report_drop(request, reason)
+        if interrupt and self.interrupt_fn is not None:
+            self.counters["interrupted"] += 1
+            try:
+                self.interrupt_fn()
+            except Exception:
+                pass
+        return True
+
+    def clear(self, priority=None):
+        """Drop queued requests, optionally only one message class"""
+        with self._condition:
+            for request in self._live_requests():
+                if priority is None or request.priority == priority:
+                    self._cancel(request)
+
+    def _live_requests(self):
+        return [request for request in self._heap if not request.cancelled]
+
+    def _cancel(self, request):
+        request.cancelled = True
+        if request.key is not None and self._by_key.get(request.key) is request:
+            del self._by_key[request.key]
+
+    def _report_drop(self, request, reason):
+        if self.on_drop is not None:
+            try:
+                self.on_drop(request, reason)
+            except Exception:
+                pass
+
+    # -------------------- WORKER SIDE --------------------
+    def _next_request(self, timeout):
+        """Highest-priority request that has not expired, or None"""
+        expired = []
+        with self._condition:
+            deadline = time.time() + timeout
+            request = None
+            while request is None and not self._stop_event.is_set():
+                while self._heap:
+                    candidate = heapq.heappop(self._heap)
+                    if candidate.cancelled:
+                        continue
+                    self._cancel(candidate)
+                    if time.time() > candidate.expires:
+                        self.counters["expired"] += 1
+                        expired.append(candidate)
+                        continue
+                    request = candidate
+                    break
+                if request is None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            self.current = request
+        for stale in expired:
+            self._report_drop(stale, "expired")
+        return request
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            request = self._next_request(timeout=1.0)
+            if request is None:
+                continue
+            TTS_QUEUE_WAIT_SECONDS.observe(time.time() - request.created, service=self.name, queue="scheduler")
+            try:
+                if self.on_start is not None:
+                    self.on_start(request)
+                self.speak_fn(request.text)
+                self.counters["spoken"] += 1
+            except Exception as e:
+                print(f"❌ {self.name} speech error: {e}")
+            finally:
+                with self._condition:
+                    self.current = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-speech", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self.interrupt_fn is not None and self.current is not None:
+            try:
+                self.interrupt_fn()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def status(self):
+        with self._condition:
+            queued = self._live_requests()
+            current = self.current
+        return {
+            "speaking": PRIORITY_NAMES[current.priority] if current is not None else None,
+            "queued": {name: sum(1 for r in queued if r.priority == p) for p, name in PRIORITY_NAMES.items()},
+            "counters": dict(self.counters),
+        }
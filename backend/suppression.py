@@ -0,0 +1,98 @@
+"""
+Array-backed overlap suppression shared by the object, currency and face pipelines.
+
+Boxes are (N, 4) arrays in x1, y1, x2, y2 pixel order, scores are (N,) and
+classes are optional (N,) integer ids.
+"""
+
+import numpy as np
+
+
+# -------------------- PAIRWISE OVERLAP --------------------
+def box_areas(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    widths = np.clip(boxes[:, 2] - boxes[:, 0], 0, None)
+    heights = np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+    return widths * heights
+
+
+def pairwise_intersection(boxes_a, boxes_b):
+    """Intersection areas as an (len(a), len(b)) matrix"""
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    overlap = np.clip(bottom_right - top_left, 0, None)
+    return overlap[..., 0] * overlap[..., 1]
+
+
+def pairwise_iou(boxes_a, boxes_b):
+    intersection = pairwise_intersection(boxes_a, boxes_b)
+    union = box_areas(boxes_a)[:, None] + box_areas(boxes_b)[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def pairwise_containment(boxes_a, boxes_b):
+    """Fraction of each box in a that is covered by each box in b"""
+    intersection = pairwise_intersection(boxes_a, boxes_b)
+    areas_a = box_areas(boxes_a)[:, None]
+    return np.divide(intersection, areas_a, out=np.zeros_like(intersection), where=areas_a > 0)
+
+
+# -------------------- SUPPRESSION --------------------
+def suppress_overlaps(boxes, scores, classes=None, iou_threshold=None,
+                      containment_threshold=None, class_aware=False, max_detections=None):
+    """
+    Greedy score-ordered suppression. A box is dropped when it overlaps an
+    already kept box by more than iou_threshold (IoU) or containment_threshold
+    (share of its own area). Returns the kept indices, best score first.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if class_aware and classes is not None:
+        classes = np.asarray(classes).reshape(-1)
+    else:
+        classes = None
+
+    order = np.argsort(-scores, kind="stable")
+    areas = box_areas(boxes)
+    keep = []
+
+    while order.size > 0:
+        best = order[0]
+        keep.append(best)
+        if max_detections is not None and len(keep) >= max_detections:
+            break
+        rest = order[1:]
+        if rest.size == 0:
+            break
+
+        intersection = pairwise_intersection(boxes[best], boxes[rest])[0]
+        suppressed = np.zeros(rest.size, dtype=bool)
+        if iou_threshold is not None:
+            union = areas[best] + areas[rest] - intersection
+            iou = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+            suppressed |= iou > iou_threshold
+        if containment_threshold is not None:
+            suppressed |= intersection > areas[rest] * containment_threshold
+        if classes is not None:
+            suppressed &= classes[rest] == classes[best]
+
+        order = rest[~suppressed]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+def filter_box_sizes(boxes, min_width=0, min_height=0, max_width=None, max_height=None):
+    """Boolean mask of boxes whose pixel size falls inside the given limits"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    widths = boxes[:, 2] - boxes[:, 0]
+    heights = boxes[:, 3] - boxes[:, 1]
+    mask = (widths >= min_width) & (heights >= min_height)
+    if max_width is not None:
+        mask &= widths <= max_width
+    if max_height is not None:
+        mask &= heights <= max_height
+    return mask
@@ -0,0 +1,124 @@
+"""
+Opt-in per-frame tracing, exported as Chrome / Perfetto trace-event JSON.
+
+Each service has one FrameTracer. Frame loops tag the current thread with
+a frame id (set_frame); every span recorded on that thread while tracing
+is on is attributed to that frame. Only the last max_frames frames are
+kept, so tracing can stay on indefinitely. Load the export in
+chrome://tracing or ui.perfetto.dev to see per-thread overlap and stalls.
+
+Tracing is off by default; set VISION_TRACE=1 or use the /trace endpoints.
+Recording a span while it is off costs a single attribute check.
+"""
+
+import os
+import threading
+from collections import OrderedDict, deque
+
+
+TRACE_ENABLED_BY_DEFAULT = os.getenv("VISION_TRACE", "0") == "1"
+
+
+class FrameTracer:
+    def __init__(self, service, max_frames=300, max_untagged=1000):
+        self.service = service
+        self.max_frames = max_frames
+        self.enabled = TRACE_ENABLED_BY_DEFAULT
+        self._lock = threading.Lock()
+        self._frames = OrderedDict()
+        self._untagged = deque(maxlen=max_untagged)
+        self._thread_names = {}
+        self._local = threading.local()
+        self._frame_counter = 0
+
+    # -------------------- FRAME TAGGING --------------------
+    def set_frame(self, frame_id):
+        """Attribute spans recorded on this thread to frame_id"""
+        self._local.frame_id = frame_id
+
+    def next_frame(self):
+        """Allocate a new frame id for single-threaded loops and tag this thread with it"""
+        with self._lock:
+            self._frame_counter += 1
+            frame_id = self._frame_counter
+        self._local.frame_id = frame_id
+        return frame_id
+
+    # -------------------- RECORDING --------------------
+    def record(self, name, started, finished, category=None):
+        """One complete span; started/finished are time.perf_counter() values"""
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        frame_id = getattr(self._local, "frame_id", None)
+        event = {
+            "name": name,
+            "cat": category or self.service,
+            "ph": "X",
+            "ts": started * 1e6,
+            "dur": max(0.0, finished - started) * 1e6,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": {"frame": frame_id, "service": self.service},
+        }
+        with self._lock:
+            self._thread_names[thread.ident] = thread.name
+            if frame_id is None:
+                self._untagged.append(event)
+                return
+            events = self._frames.get(frame_id)
+            if events is None:
+                events = self._frames[frame_id] = []
+                while len(self._frames) > self.max_frames:
+                    self._frames.popitem(last=False)
+            events.append(event)
+
+    # -------------------- CONTROL / EXPORT --------------------
+    def start(self):
+        self.clear()
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._untagged.clear()
+
+    def export(self):
+        """Chrome trace-event JSON object for the buffered frames"""
+        with self._lock:
+            events = [event for frame_events in self._frames.values() for event in frame_events]
+            events.extend(self._untagged)
+            thread_names = dict(self._thread_names)
+            frame_count = len(self._frames)
+        pid = os.getpid()
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.service}}]
+        metadata.extend(
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        )
+        events.sort(key=lambda event: event["ts"])
+        return {
+            "traceEvents": metadata + events,
+            "displayTimeUnit": "ms",
+            "otherData": {"service": self.service, "frames": frame_count, "enabled": self.enabled},
+        }
+
+    def status(self):
+        with self._lock:
+            return {"enabled": self.enabled, "frames": len(self._frames), "max_frames": self.max_frames}
+
+
+_tracers = {}
+_tracers_lock = threading.Lock()
+
+
+def get_tracer(service):
+    """The process-wide tracer for a service, created on first use"""
+    tracer = _tracers.get(service)
+    if tracer is None:
+        with _tracers_lock:
+            tracer = _tracers.setdefault(service, FrameTracer(service))
+    return tracer
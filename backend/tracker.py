@@ -0,0 +1,202 @@
+"""
+Lightweight multi-object tracker used between detector calls.
+
+Tracks are held as NumPy arrays (boxes, velocities, scores, classes) and
+associated to fresh detections by class-aware IoU. Between detections the
+boxes are carried forward with a constant-velocity alpha-beta filter,
+optionally refined with sparse Lucas-Kanade optical flow.
+"""
+
+import itertools
+import warnings
+
+import numpy as np
+import cv2
+
+from suppression import pairwise_iou
+
+
+# -------------------- ASSOCIATION --------------------
+def greedy_match(iou_matrix, iou_threshold):
+    """Greedy highest-IoU-first matching; returns (row, col) pairs"""
+    if iou_matrix.size == 0:
+        return []
+    rows, cols = np.nonzero(iou_matrix >= iou_threshold)
+    if rows.size == 0:
+        return []
+    order = np.argsort(-iou_matrix[rows, cols], kind="stable")
+    used_rows, used_cols, matches = set(), set(), []
+    for index in order:
+        row, col = int(rows[index]), int(cols[index])
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        matches.append((row, col))
+    return matches
+
+
+# -------------------- TRACKER --------------------
+class IoUTracker:
+    """
+    update(boxes, scores, classes) after a detector call, predict(frame)
+    on the frames in between. needs_detection() tells the caller when the
+    detector has to run again.
+    """
+
+    def __init__(self, detection_interval=3, iou_threshold=0.3, max_misses=2,
+                 min_confidence=0.35, confidence_decay=0.92, alpha=0.6, beta=0.2,
+                 use_optical_flow=True, flow_scale=0.5):
+        self.detection_interval = detection_interval
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_confidence = min_confidence
+        self.confidence_decay = confidence_decay
+        self.alpha = alpha
+        self.beta = beta
+        self.use_optical_flow = use_optical_flow
+        self.flow_scale = flow_scale
+
+        self._id_counter = itertools.count(1)
+        self.frames_since_detection = 0
+        self.flow_lost = False
+        self._previous_gray = None
+        self.reset()
+
+    def reset(self):
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.velocities = np.empty((0, 2), dtype=np.float32)
+        self.scores = np.empty(0, dtype=np.float32)
+        self.classes = np.empty(0, dtype=np.int64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.misses = np.empty(0, dtype=np.int64)
+        self.frames_since_detection = self.detection_interval
+
+    def __len__(self):
+        return len(self.ids)
+
+    def needs_detection(self):
+        if self.frames_since_detection >= self.detection_interval or self.flow_lost:
+            return True
+        return bool(len(self.scores)) and float(self.scores.min()) < self.min_confidence
+
+    def update(self, boxes, scores, classes, frame=None):
+        """Associate a fresh detector result; returns the track id of every detection"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        classes = np.asarray(classes, dtype=np.int64).reshape(-1)
+
+        iou = pairwise_iou(self.boxes, boxes)
+        if iou.size:
+            iou[self.classes[:, None] != classes[None, :]] = 0.0
+        matches = greedy_match(iou, self.iou_threshold)
+
+        detection_ids = np.zeros(len(boxes), dtype=np.int64)
+        matched_tracks = np.zeros(len(self.ids), dtype=bool)
+        for track_index, detection_index in matches:
+            residual = self._centers(boxes[detection_index:detection_index + 1])[0] - \
+                self._centers(self.boxes[track_index:track_index + 1])[0]
+            self.velocities[track_index] += self.beta * residual
+            self.boxes[track_index] += self.alpha * (boxes[detection_index] - self.boxes[track_index])
+            self.scores[track_index] = scores[detection_index]
+            self.misses[track_index] = 0
+            matched_tracks[track_index] = True
+            detection_ids[detection_index] = self.ids[track_index]
+
+        # Unmatched tracks age out, unmatched detections start new tracks
+        self.misses[~matched_tracks] += 1
+        alive = self.misses <= self.max_misses
+        self._keep(alive)
+
+        new_detections = np.setdiff1d(np.arange(len(boxes)), [d for _, d in matches])
+        if new_detections.size:
+            new_ids = np.array([next(self._id_counter) for _ in new_detections], dtype=np.int64)
+            detection_ids[new_detections] = new_ids
+            self.boxes = np.vstack([self.boxes, boxes[new_detections]])
+            self.velocities = np.vstack([self.velocities, np.zeros((new_detections.size, 2), dtype=np.float32)])
+            self.scores = np.concatenate([self.scores, scores[new_detections]])
+            self.classes = np.concatenate([self.classes, classes[new_detections]])
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.misses = np.concatenate([self.misses, np.zeros(new_detections.size, dtype=np.int64)])
+
+        self.frames_since_detection = 0
+        self.flow_lost = False
+        if frame is not None and self.use_optical_flow:
+            self._previous_gray = self._to_gray(frame)
+        return detection_ids
+
+    def predict(self, frame=None):
+        """Carry every track forward one frame without running the detector"""
+        self.frames_since_detection += 1
+        if not len(self.ids):
+            return self.current_tracks()
+
+        shift = self.velocities.copy()
+        if frame is not None and self.use_optical_flow:
+            flow_shift = self._optical_flow_shift(frame)
+            if flow_shift is not None:
+                measured = ~np.isnan(flow_shift[:, 0])
+                self.velocities[measured] += self.beta * (flow_shift[measured] - self.velocities[measured])
+                shift[measured] = flow_shift[measured]
+
+        self.boxes[:, [0, 2]] += shift[:, 0:1]
+        self.boxes[:, [1, 3]] += shift[:, 1:2]
+        self.scores *= self.confidence_decay
+        return self.current_tracks()
+
+    def current_tracks(self):
+        """(ids, boxes, scores, classes) snapshot of the live tracks"""
+        return self.ids.copy(), self.boxes.copy(), self.scores.copy(), self.classes.copy()
+
+    def _keep(self, mask):
+        self.boxes = self.boxes[mask]
+        self.velocities = self.velocities[mask]
+        self.scores = self.scores[mask]
+        self.classes = self.classes[mask]
+        self.ids = self.ids[mask]
+        self.misses = self.misses[mask]
+
+    @staticmethod
+    def _centers(boxes):
+        return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+
+    def _to_gray(self, frame):
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.flow_scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.flow_scale, fy=self.flow_scale, interpolation=cv2.INTER_AREA)
+        return frame
+
+    def _optical_flow_shift(self, frame):
+        """Median LK displacement of five points per box; NaN rows where flow failed"""
+        gray = self._to_gray(frame)
+        previous = self._previous_gray
+        self._previous_gray = gray
+        if previous is None or previous.shape != gray.shape:
+            return None
+
+        x1, y1, x2, y2 = (self.boxes * self.flow_scale).T
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        qx, qy = (x2 - x1) / 4, (y2 - y1) / 4
+        points_x = np.stack([cx, cx - qx, cx + qx, cx, cx], axis=1)
+        points_y = np.stack([cy, cy, cy, cy - qy, cy + qy], axis=1)
+        points = np.stack([points_x, points_y], axis=2).reshape(-1, 1, 2).astype(np.float32)
+
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            previous, gray, points, None, winSize=(15, 15), maxLevel=2
+        )
+        if next_points is None:
+            self.flow_lost = True
+            return None
+
+        displacement = (next_points - points).reshape(len(self.ids), 5, 2) / self.flow_scale
+        valid = status.reshape(len(self.ids), 5).astype(bool)
+        displacement[~valid] = np.nan
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            shift = np.nanmedian(displacement, axis=1)
+        lost = np.isnan(shift[:, 0])
+        if lost.any():
+            # Losing flow on a box means the carried-forward position can no longer be trusted
+            self.scores[lost] = 0.0
+        return shift.astype(np.float32)
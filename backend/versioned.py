@@ -0,0 +1,126 @@
+"""
+Versioned state for cheap polling.
+
+A ChangeNotifier carries a version number that producers bump from any
+thread and that async handlers can wait on. conditional_json() turns it
+into ETag / If-None-Match handling (304 when the client already has the
+current version) plus an optional long-poll that holds the request until
+the version moves or the wait times out.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+
+from fastapi.responses import JSONResponse, Response
+
+
+MAX_LONG_POLL_SECONDS = 30.0
+
+
+class ChangeNotifier:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = set()
+        self.version = 0
+
+    def bump(self):
+        """Advance the version and wake every waiting request; safe from any thread"""
+        with self._lock:
+            self.version += 1
+            waiters = list(self._waiters)
+            self._waiters.clear()
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass
+        return self.version
+
+    async def wait_for_change(self, since, timeout):
+        """True once version != since, False if timeout passes first"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            if self.version != since:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class VersionedValue:
+    """A value whose version only moves when it actually changes"""
+
+    def __init__(self, value=None):
+        self.value = value
+        self.notifier = ChangeNotifier()
+
+    @property
+    def version(self):
+        return self.notifier.version
+
+    def set(self, value):
+        if value == self.value:
+            return False
+        self.value = value
+        self.notifier.bump()
+        return True
+
+
+# -------------------- HTTP HELPERS --------------------
+def _etag(tag, version):
+    return f'"{tag}-{version}"'
+
+
+def requested_version(request, tag, since=None):
+    """Version the client already holds, from ?since= or If-None-Match"""
+    if since is not None:
+        return since
+    header = request.headers.get("if-none-match", "")
+    for candidate in header.split(","):
+        candidate = candidate.strip().removeprefix("W/").strip('"')
+        prefix, _, version = candidate.rpartition("-")
+        if prefix == tag and version.isdigit():
+            return int(version)
+    return None
+
+
+async def conditional_json(request, notifier, get_payload, tag, since=None, wait=0.0):
+    """
+    JSON for get_payload() tagged with the notifier version. A client that
+    already has that version gets 304, after first waiting up to `wait`
+    seconds for a newer one when it asked to long-poll.
+    """
+    known_version = requested_version(request, tag, since)
+    if wait > 0 and known_version == notifier.version:
+        await notifier.wait_for_change(known_version, min(wait, MAX_LONG_POLL_SECONDS))
+
+    version = notifier.version
+    headers = {"ETag": _etag(tag, version), "Cache-Control": "no-cache"}
+    if known_version == version:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(get_payload(), headers=headers)
+
+
+def etag_json(request, payload):
+    """Content-hash ETag for payloads without a version; 304 when unchanged"""
+    body = json.dumps(payload, separators=(",", ":"), sort_keys=True, default=str).encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [candidate.strip().removeprefix("W/") for candidate in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
@@ -7,6 +7,8 @@ function App() {
   const [isConnected, setIsConnected] = useState(false);
   const logsEndRef = useRef(null);
   const wsRef = useRef(null);
+  const canvasRef = useRef(null);
+  const drawOverlay = status !== null && status.annotate_frames === false;
 
   // Connect to WebSocket for logs
   useEffect(() => {
@@ -21,7 +23,9 @@ function App() {
         
         wsRef.current.onmessage = (event) => {
           const logData = JSON.parse(event.data);
-          setLogs(prevLogs => [...prevLogs.slice(-49), logData]); // Keep last 50 logs
+          // The backend batches log entries into one frame
+          const entries = Array.isArray(logData) ? logData : [logData];
+          setLogs(prevLogs => [...prevLogs, ...entries].slice(-50)); // Keep last 50 logs
         };
         
         wsRef.current.onclose = () => {
@@ -49,6 +53,66 @@ function App() {
     };
   }, []);
 
+  // Draw boxes client-side from the detections channel when the server streams raw frames
+  useEffect(() => {
+    if (!drawOverlay) return undefined;
+    let socket;
+    let reconnectTimer;
+    const sideColors = { left: '#6464ff', center: '#ff6464', right: '#64ff64' };
+
+    const drawDetections = (detections) => {
+      const canvas = canvasRef.current;
+      if (!canvas) return;
+      const { clientWidth, clientHeight } = canvas;
+      canvas.width = clientWidth;
+      canvas.height = clientHeight;
+      const ctx = canvas.getContext('2d');
+      ctx.clearRect(0, 0, clientWidth, clientHeight);
+
+      // The feed uses object-fit: contain, so map frame pixels into the letterboxed image area
+      const [frameWidth, frameHeight] = detections.size;
+      const scale = Math.min(clientWidth / frameWidth, clientHeight / frameHeight);
+      const offsetX = (clientWidth - frameWidth * scale) / 2;
+      const offsetY = (clientHeight - frameHeight * scale) / 2;
+
+      ctx.font = '14px sans-serif';
+      detections.boxes.forEach(([x1, y1, x2, y2], i) => {
+        const color = sideColors[detections.sides[i]] || '#ffffff';
+        const left = offsetX + x1 * scale;
+        const top = offsetY + y1 * scale;
+        ctx.strokeStyle = color;
+        ctx.lineWidth = detections.scores[i] > 0.5 ? 3 : 2;
+        ctx.strokeRect(left, top, (x2 - x1) * scale, (y2 - y1) * scale);
+
+        const distance = detections.distances[i];
+        const label = distance !== null ? `${detections.classes[i]} ${distance.toFixed(1)}m` : detections.classes[i];
+        const textWidth = ctx.measureText(label).width;
+        ctx.fillStyle = color;
+        ctx.fillRect(left, top - 20, textWidth + 8, 20);
+        ctx.fillStyle = '#000000';
+        ctx.fillText(label, left + 4, top - 5);
+      });
+    };
+
+    const connect = () => {
+      socket = new WebSocket('ws://127.0.0.1:8000/ws/detections?every_frame=true');
+      socket.onmessage = (event) => drawDetections(JSON.parse(event.data));
+      socket.onclose = () => {
+        reconnectTimer = setTimeout(connect, 3000);
+      };
+    };
+
+    connect();
+
+    return () => {
+      clearTimeout(reconnectTimer);
+      if (socket) {
+        socket.onclose = null;
+        socket.close();
+      }
+    };
+  }, [drawOverlay]);
+
   // Fetch status every 2 seconds
   useEffect(() => {
     const fetchStatus = async () => {
@@ -125,6 +189,12 @@ function App() {
               alt="Live Camera Feed"
               className={styles.cameraFeed}
             />
+            {drawOverlay && (
+              <canvas
+                ref={canvasRef}
+                style={{ position: 'absolute', inset: 0, width: '100%', height: '100%', pointerEvents: 'none' }}
+              />
+            )}
             <div className={styles.cameraOverlay}>
               <div className={styles.overlayInfo}>
                 <div>📹 Live Detection Active</div>